@@ -1,20 +1,34 @@
 from fastapi import FastAPI, Request, File, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_core.documents import Document
 from dotenv import load_dotenv
+from pypdf import PdfReader
 from transformers import AutoConfig, AutoTokenizer, AutoModelForSeq2SeqLM, AutoModelForCausalLM
+from transformers import StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager, nullcontext
+from functools import lru_cache, partial
 from uuid import uuid4
+import asyncio
+import faiss
+import hashlib
+import logging
+import orjson
 import os
+import queue
+import threading
 import time
+import unicodedata
 import uuid
+import weakref
 import torch
 import uvicorn
 
@@ -23,14 +37,80 @@ import uvicorn
 from utils.postprocess import extract_final_answer, extract_final_summary, extract_comparison
 
 # Centralised minimal prompt builders (short prompts → less instruction echoing).
-from utils.prompt_templates import build_ask_prompt, build_summarize_prompt, build_compare_prompt
+from utils.prompt_templates import (
+    build_ask_prompt,
+    build_summarize_prompt,
+    build_compare_prompt,
+    PROMPT_INSTRUCTIONS,
+)
+
+# Sharded session store with heap-based TTL expiry.
+from utils.session_store import SessionState, SessionStore
+
+# Prompt tokenization that reuses the ids of the fixed prompt parts.
+from utils.prompt_encoding import PromptEncoder
+
+# Per-session prompt KV-cache reuse (decoder-only models).
+from utils.kv_cache import PrefixKVCache
+
+# FAISS index construction (flat for small PDFs, HNSW for large ones).
+from utils.vector_index import build_vectorstore
+
+# Optional Redis cache of final responses.
+from utils.response_cache import ResponseCache
+
+# Per-index cache of retrieval results for repeated / near-identical queries.
+from utils.query_cache import SemanticQueryCache
+
+# Optional micro-batching of concurrent generate calls.
+from utils.batching import MicroBatcher
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# ===============================
+# SESSION STORAGE (REQUIRED: keep sessionId)
+# ===============================
+# Format: { session_id: SessionState(vectorstores=[FAISS], filename, last_accessed) }
+SESSION_TIMEOUT = 3600  # 1 hour
+SESSION_CLEANUP_INTERVAL = 30  # seconds between background expiry passes
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "1000"))  # LRU-evicted beyond this
+
+
+def _release_session_caches(session_id: str):
+    if prompt_kv_cache is not None:
+        prompt_kv_cache.discard_session(session_id)
+
+
+sessions = SessionStore(
+    timeout=SESSION_TIMEOUT,
+    on_expire=_release_session_caches,
+    max_sessions=MAX_SESSIONS,
+)
+
+
+async def _expire_sessions_periodically():
+    while True:
+        await asyncio.sleep(SESSION_CLEANUP_INTERVAL)
+        sessions.cleanup_expired()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Expire idle sessions in the background instead of on every request.
+    cleanup_task = asyncio.create_task(_expire_sessions_periodically())
+    try:
+        yield
+    finally:
+        cleanup_task.cancel()
+
+
 app = FastAPI(
     title="PDF QA Bot API",
     description="PDF Question-Answering Bot (Session-based, No Auth)",
-    version="2.1.0"
+    version="2.1.0",
+    lifespan=lifespan,
 )
 
 # CORS
@@ -47,17 +127,132 @@ limiter = Limiter(key_func=get_remote_address)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
-# ===============================
-# SESSION STORAGE (REQUIRED: keep sessionId)
-# ===============================
-# Format: { session_id: { "vectorstores": [FAISS], "last_accessed": float } }
-sessions = {}
-SESSION_TIMEOUT = 3600  # 1 hour
-
 # Embedding model (loaded once)
-embedding_model = HuggingFaceEmbeddings(
-    model_name="sentence-transformers/all-MiniLM-L6-v2"
+# EMBEDDING_BACKEND=onnx runs the same model through ONNX Runtime
+# (needs optimum[onnxruntime]); the default keeps sentence-transformers.
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+
+if EMBEDDING_BACKEND == "onnx":
+    from utils.onnx_embeddings import OnnxEmbeddings
+
+    embedding_model = OnnxEmbeddings(
+        EMBEDDING_MODEL_NAME,
+        export_dir=os.getenv("ONNX_EMBEDDING_DIR", "onnx_minilm"),
+    )
+else:
+    # One large batch per upload instead of the default 32-text batches.
+    # MiniLM already L2-normalises; normalize_embeddings keeps that explicit
+    # (and matches the ONNX backend).
+    embedding_model = HuggingFaceEmbeddings(
+        model_name=EMBEDDING_MODEL_NAME,
+        model_kwargs={"device": "cuda" if torch.cuda.is_available() else "cpu"},
+        encode_kwargs={"batch_size": 256, "normalize_embeddings": True},
+    )
+
+# Persist chunk embeddings across restarts (SQLite, float16), keeping at most
+# EMBEDDING_CACHE_MAX_ROWS vectors (oldest evicted first).  Best-effort: SQLite
+# errors such as another worker holding the lock fall back to the model.
+# EMBEDDING_CACHE_PATH="" disables the cache.
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "embeddings.db")
+
+if EMBEDDING_CACHE_PATH:
+    from utils.embedding_cache import DiskCachedEmbeddings
+
+    embedding_model = DiskCachedEmbeddings(
+        embedding_model,
+        EMBEDDING_CACHE_PATH,
+        EMBEDDING_MODEL_NAME,
+        max_rows=int(os.getenv("EMBEDDING_CACHE_MAX_ROWS", "200000")),
+    )
+
+
+def _normalize_query(text: str) -> str:
+    # MiniLM's tokenizer lowercases with str.lower() and ignores extra
+    # whitespace, so these variants embed identically and can share one cache
+    # entry.  (casefold() would go further, e.g. "ß" -> "ss", which the
+    # tokenizer does not.)
+    return " ".join(unicodedata.normalize("NFC", text).lower().split())
+
+
+@lru_cache(maxsize=1024)
+def _embed_normalized_query(text: str) -> tuple[float, ...]:
+    return tuple(embedding_model.embed_query(text))
+
+
+def embed_query(text: str) -> tuple[float, ...]:
+    """
+    Embedding of a retrieval query, cached by its normalized text.
+
+    The fixed /summarize and /compare queries, and repeated questions, skip
+    the embedding model forward pass entirely after the first call.
+    """
+    return _embed_normalized_query(_normalize_query(text))
+
+
+# Searches over several sessions' indexes run concurrently: FAISS releases
+# the GIL inside search, so N selected PDFs cost about one search, not N.
+RETRIEVAL_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="retrieval")
+
+# vectorstore -> {k: SemanticQueryCache}; entries disappear with the index.
+# Only repeats of the same (normalised) query hit: near-duplicates such as
+# "revenue in 2020" / "revenue in 2021" embed too closely to tell apart.
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "3600"))
+_query_caches: "weakref.WeakKeyDictionary[FAISS, dict]" = weakref.WeakKeyDictionary()
+
+
+def search_vectorstores(vectorstores: list, query: str, k: int) -> list:
+    """
+    Top-*k* chunks for *query* from each vectorstore, in input order.
+
+    A query repeated on the same index within ``QUERY_CACHE_TTL`` seconds
+    reuses the earlier results without searching.
+    """
+    query_vector = embed_query(query)
+
+    def search(vs):
+        cache = _query_caches.setdefault(vs, {}).setdefault(
+            k, SemanticQueryCache(ttl=QUERY_CACHE_TTL)
+        )
+        docs = cache.get(query_vector)
+        if docs is None:
+            docs = vs.similarity_search_by_vector(query_vector, k=k)
+            cache.put(query_vector, docs)
+        return docs
+
+    if len(vectorstores) == 1:
+        return [search(vectorstores[0])]
+    return list(RETRIEVAL_POOL.map(search, vectorstores))
+
+
+# Move each session's FAISS index to the GPU once it is built. Needs a
+# faiss-gpu build; with faiss-cpu (or FAISS_GPU=0) indexes stay on the CPU.
+# One StandardGpuResources is shared by all indexes (it owns the scratch
+# memory and CUDA streams, so one per index would waste GPU memory).
+# FAISS has no GPU version of the float16 SQ / HNSW indexes, so GPU-bound
+# indexes are built flat (build_vectorstore(gpu=True)) and stored as float16
+# on the GPU instead.
+USE_FAISS_GPU = (
+    os.getenv("FAISS_GPU", "1") == "1"
+    and torch.cuda.is_available()
+    and hasattr(faiss, "StandardGpuResources")
 )
+faiss_gpu_resources = faiss.StandardGpuResources() if USE_FAISS_GPU else None
+
+
+def move_index_to_gpu(vectorstore: FAISS) -> FAISS:
+    if faiss_gpu_resources is None:
+        return vectorstore
+    options = faiss.GpuClonerOptions()
+    options.useFloat16 = True
+    try:
+        vectorstore.index = faiss.index_cpu_to_gpu(
+            faiss_gpu_resources, 0, vectorstore.index, options
+        )
+    except RuntimeError as e:
+        # e.g. CUDA out of memory — keep serving from the CPU index.
+        logger.warning("Keeping FAISS index on the CPU: %s", e)
+    return vectorstore
 
 # ===============================
 # LOAD GENERATION MODEL ONCE
@@ -68,57 +263,230 @@ config = AutoConfig.from_pretrained(HF_GENERATION_MODEL)
 is_encoder_decoder = bool(getattr(config, "is_encoder_decoder", False))
 tokenizer = AutoTokenizer.from_pretrained(HF_GENERATION_MODEL)
 
+# Half precision on GPU halves the weight bytes read per decode step.
+# T5 overflows in float16, so encoder-decoder models only drop to bfloat16.
+if not torch.cuda.is_available():
+    MODEL_DTYPE = torch.float32
+elif torch.cuda.is_bf16_supported():
+    MODEL_DTYPE = torch.bfloat16
+elif is_encoder_decoder:
+    MODEL_DTYPE = torch.float32
+else:
+    MODEL_DTYPE = torch.float16
+
 if is_encoder_decoder:
-    model = AutoModelForSeq2SeqLM.from_pretrained(HF_GENERATION_MODEL)
+    model = AutoModelForSeq2SeqLM.from_pretrained(HF_GENERATION_MODEL, dtype=MODEL_DTYPE)
 else:
-    model = AutoModelForCausalLM.from_pretrained(HF_GENERATION_MODEL)
+    model = AutoModelForCausalLM.from_pretrained(HF_GENERATION_MODEL, dtype=MODEL_DTYPE)
 
 if torch.cuda.is_available():
     model = model.to("cuda")
 
 model.eval()
 
+# TORCH_COMPILE=1 compiles the forward pass on GPU (fused kernels). Only
+# `forward` is compiled so that `model.generate` and `model.parameters()` keep
+# working unchanged. Off by default, and without CUDA graphs
+# ("reduce-overhead"): generate() uses a dynamic KV cache, so the sequence
+# length changes every decode step and graphs would be re-recorded per shape
+# until the recompile limit. dynamic=True compiles one shape-generic graph.
+USE_TORCH_COMPILE = os.getenv("TORCH_COMPILE", "0") == "1"
+
+if USE_TORCH_COMPILE and torch.cuda.is_available() and hasattr(torch, "compile"):
+    model.forward = torch.compile(model.forward, mode="default", dynamic=True, fullgraph=False)
+
+# Per-request constants, resolved once instead of on every generate call.
+MODEL_DEVICE = next(model.parameters()).device
+PAD_TOKEN_ID = tokenizer.pad_token_id or tokenizer.eos_token_id
+
+MAX_INPUT_TOKENS = 2048
+
+# Tokenize the fixed instruction prefix once and the retrieved context through
+# an LRU cache, so each request only tokenizes its short tail. Checked at
+# startup against whole-prompt tokenization on sample prompts; tokenizers
+# where the pieces would give different ids use the whole-prompt call.
+prompt_encoder = PromptEncoder(
+    tokenizer,
+    PROMPT_INSTRUCTIONS,
+    max_length=MAX_INPUT_TOKENS,
+    sample_prompts=[
+        build_ask_prompt(context="Alpha beta.\n\nGamma delta.", question="What is alpha?"),
+        build_summarize_prompt(context="Alpha beta.\n\nGamma delta."),
+        build_compare_prompt(per_doc_contexts=["Alpha beta.", "Gamma delta."]),
+    ],
+)
+
+# Reuse the previous turn's prompt KV cache for follow-up questions on the
+# same sessions, so only the tokens after the shared prefix are prefilled.
+# Decoder-only models only; KV_CACHE_MAX_MB=0 disables it.
+KV_CACHE_MAX_MB = int(os.getenv("KV_CACHE_MAX_MB", "512"))
+
+if not is_encoder_decoder and KV_CACHE_MAX_MB > 0:
+    prompt_kv_cache = PrefixKVCache(config, model.dtype, KV_CACHE_MAX_MB * 1024 * 1024)
+else:
+    prompt_kv_cache = None
+
+# Cache final responses in Redis when REDIS_URL is set. Keys hash the model
+# name and the full prompt: greedy decoding makes the output a pure function
+# of the two, and expired or re-uploaded sessions can never hit stale data.
+REDIS_URL = os.getenv("REDIS_URL")
+response_cache = ResponseCache(REDIS_URL, ttl=SESSION_TIMEOUT) if REDIS_URL else None
+
+
 # ===============================
 # REQUEST MODELS
 # ===============================
 class AskRequest(BaseModel):
     question: str = Field(..., min_length=1)
     session_ids: list = []
+    stream: bool = False  # stream tokens as Server-Sent Events
 
 
 class SummarizeRequest(BaseModel):
     session_ids: list = []
+    stream: bool = False  # stream tokens as Server-Sent Events
 
 
 class CompareRequest(BaseModel):
     session_ids: list = []
+    stream: bool = False  # stream tokens as Server-Sent Events
 
 
 # ===============================
 # UTILITIES
 # ===============================
-def cleanup_expired_sessions():
-    current_time = time.time()
-    expired = [
-        sid for sid, data in sessions.items()
-        if current_time - data["last_accessed"] > SESSION_TIMEOUT
+def encode_prompt(prompt: str):
+    """
+    Tokenize *prompt* into ``input_ids`` / ``attention_mask`` tensors on
+    MODEL_DEVICE (same ids as the plain tokenizer call, truncated to
+    MAX_INPUT_TOKENS with special tokens kept).
+    """
+    input_ids = torch.tensor([prompt_encoder.encode(prompt)], device=MODEL_DEVICE)
+    return {"input_ids": input_ids, "attention_mask": torch.ones_like(input_ids)}
+
+
+@torch.inference_mode()
+def generate_batch(requests: list[tuple[str, int]]) -> list[str]:
+    """
+    Generate completions for several ``(prompt, max_new_tokens)`` requests
+    in one ``model.generate`` call.
+
+    Prompts are left-padded so every row's last prompt token lines up (what
+    decoder-only models need; encoder-decoder models just mask the padding).
+    The batch decodes up to the largest ``max_new_tokens``; greedy decoding
+    makes each row's first tokens identical to an unbatched run, so every
+    result is cut back to its own limit.
+    """
+    encoded = [encode_prompt(prompt)["input_ids"][0] for prompt, _ in requests]
+    prompt_len = max(len(ids) for ids in encoded)
+
+    input_ids = torch.full(
+        (len(encoded), prompt_len), PAD_TOKEN_ID, dtype=torch.long, device=MODEL_DEVICE
+    )
+    attention_mask = torch.zeros_like(input_ids)
+    for row, ids in enumerate(encoded):
+        input_ids[row, prompt_len - len(ids):] = ids
+        attention_mask[row, prompt_len - len(ids):] = 1
+
+    output = model.generate(
+        input_ids=input_ids,
+        attention_mask=attention_mask,
+        max_new_tokens=max(n for _, n in requests),
+        do_sample=False,
+        pad_token_id=PAD_TOKEN_ID,
+    )
+
+    # Encoder-decoder output starts with the decoder start token;
+    # decoder-only output starts with the (padded) prompt.
+    start = 1 if is_encoder_decoder else prompt_len
+    return [
+        tokenizer.decode(output[row, start:start + n], skip_special_tokens=True)
+        for row, (_, n) in enumerate(requests)
     ]
-    for sid in expired:
-        del sessions[sid]
 
 
-def generate_response(prompt: str, max_new_tokens: int = 200) -> str:
-    device = next(model.parameters()).device
-    inputs = tokenizer(prompt, return_tensors="pt", truncation=True, max_length=2048)
-    inputs = {k: v.to(device) for k, v in inputs.items()}
+# GENERATION_MAX_BATCH > 1 routes generate_response through a micro-batcher
+# that groups requests arriving within GENERATION_BATCH_WAIT_MS. Off by
+# default: it only pays off under concurrent load, and batched calls skip
+# the per-session prompt KV cache.
+GENERATION_MAX_BATCH = int(os.getenv("GENERATION_MAX_BATCH", "1"))
+
+if GENERATION_MAX_BATCH > 1:
+    generation_batcher = MicroBatcher(
+        generate_batch,
+        max_batch=GENERATION_MAX_BATCH,
+        max_wait=int(os.getenv("GENERATION_BATCH_WAIT_MS", "10")) / 1000,
+    )
+else:
+    generation_batcher = None
+
+# Generation, streamed or not, runs on its own bounded pool rather than
+# FastAPI's shared threadpool, so slow generations cannot starve /upload or
+# the health checks. One worker serialises model.generate (torch already
+# spreads each call over every core); with micro-batching on,
+# GENERATION_MAX_BATCH workers submit together so the batcher can group them.
+# Only model work goes here: response-cache lookups must not queue behind it.
+GENERATE_POOL = ThreadPoolExecutor(
+    max_workers=max(GENERATION_MAX_BATCH, 1), thread_name_prefix="generate"
+)
+
+
+async def run_in_generate_pool(func, *args, **kwargs):
+    """Run ``func(*args, **kwargs)`` on GENERATE_POOL without blocking the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(
+        GENERATE_POOL, partial(func, *args, **kwargs)
+    )
+
+
+# Prompt-lookup decoding drafts the next tokens by matching the latest
+# n-gram against the prompt; summaries and comparisons re-quote the context
+# a lot, so several tokens are often accepted per forward pass. Decoder-only
+# models only (the encoder-decoder prompt is not part of the decoded ids).
+PROMPT_LOOKUP_NUM_TOKENS = 10
+
+
+@torch.inference_mode()
+def generate_response(
+    prompt: str, max_new_tokens: int = 200, cache_key=None, prompt_lookup: bool = False
+) -> str:
+    """
+    Generate a completion for *prompt*.
+
+    *cache_key* (endpoint name + session ids) enables prompt KV-cache
+    reuse between consecutive calls with the same key. *prompt_lookup*
+    enables prompt-lookup decoding for outputs that copy from the prompt.
+    """
+    if generation_batcher is not None:
+        return generation_batcher.submit((prompt, max_new_tokens))
+
+    inputs = encode_prompt(prompt)
+
+    use_kv_cache = cache_key is not None and prompt_kv_cache is not None
+    generate_kwargs = {}
+    if prompt_lookup and not is_encoder_decoder:
+        generate_kwargs["prompt_lookup_num_tokens"] = PROMPT_LOOKUP_NUM_TOKENS
+    if use_kv_cache:
+        past = prompt_kv_cache.lookup(cache_key, inputs["input_ids"][0])
+        if past is not None:
+            generate_kwargs["past_key_values"] = past
+        generate_kwargs["return_dict_in_generate"] = True
 
     output = model.generate(
         **inputs,
         max_new_tokens=max_new_tokens,
         do_sample=False,
-        pad_token_id=tokenizer.pad_token_id or tokenizer.eos_token_id,
+        pad_token_id=PAD_TOKEN_ID,
+        **generate_kwargs,
     )
 
+    if use_kv_cache:
+        past = output.past_key_values
+        # Keep only the prompt part; generated tokens differ every turn.
+        if hasattr(past, "crop"):
+            past.crop(inputs["input_ids"].shape[1])
+            prompt_kv_cache.store(cache_key, inputs["input_ids"][0], past)
+        output = output.sequences
+
     if is_encoder_decoder:
         return tokenizer.decode(output[0], skip_special_tokens=True)
 
@@ -128,6 +496,128 @@ def generate_response(prompt: str, max_new_tokens: int = 200) -> str:
     )
 
 
+async def cached_response(kind: str, prompt: str, finalize, **generate_kwargs) -> dict:
+    """
+    Response for *prompt*: from the response cache when possible, otherwise
+    ``finalize(generate_response(prompt, **generate_kwargs))``, then cached.
+
+    Only ``generate_response`` runs on GENERATE_POOL; the Redis round trips
+    use the default executor, so a cache hit never waits for a generation.
+    """
+    key = None
+    if response_cache is not None:
+        key = ResponseCache.key(kind, HF_GENERATION_MODEL, prompt)
+        response = await asyncio.to_thread(response_cache.get, key)
+        if response is not None:
+            return response
+
+    raw = await run_in_generate_pool(generate_response, prompt, **generate_kwargs)
+    response = finalize(raw)
+    if key is not None:
+        await asyncio.to_thread(response_cache.set, key, response)
+    return response
+
+
+class _StopOnEvent(StoppingCriteria):
+    """Stops generation as soon as *event* is set (e.g. client disconnected)."""
+
+    def __init__(self, event: threading.Event):
+        self.event = event
+
+    def __call__(self, input_ids, scores, **kwargs) -> bool:
+        return self.event.is_set()
+
+
+# Longest wait for the next streamed token, once generation has started,
+# before the stream is abandoned. Backstop only: a failed generation ends
+# its stream straight away.
+STREAM_TOKEN_TIMEOUT = float(os.getenv("STREAM_TOKEN_TIMEOUT", "60"))
+
+
+def start_response_stream(
+    prompt: str, max_new_tokens: int, stop_event: threading.Event
+) -> tuple[TextIteratorStreamer, Future]:
+    """
+    Queue generation on GENERATE_POOL and return a streamer that yields
+    decoded text pieces as they are produced, plus the pool future (which
+    holds generation's exception, if any). The streamer is ended either way.
+    Setting *stop_event* ends generation early (or skips it while still
+    queued) and frees the model for other requests.
+    """
+    streamer = TextIteratorStreamer(
+        tokenizer, skip_prompt=True, timeout=STREAM_TOKEN_TIMEOUT, skip_special_tokens=True
+    )
+
+    @torch.inference_mode()
+    def produce():
+        try:
+            if stop_event.is_set():
+                return
+            model.generate(
+                **encode_prompt(prompt),
+                max_new_tokens=max_new_tokens,
+                do_sample=False,
+                pad_token_id=PAD_TOKEN_ID,
+                streamer=streamer,
+                stopping_criteria=StoppingCriteriaList([_StopOnEvent(stop_event)]),
+            )
+        finally:
+            # Without this the reader would wait for a token that never comes.
+            streamer.end()
+
+    return streamer, GENERATE_POOL.submit(produce)
+
+
+def _sse(payload: dict) -> str:
+    return f"data: {orjson.dumps(payload).decode()}\n\n"
+
+
+def stream_sse(request: Request, prompt: str, max_new_tokens: int, finalize) -> StreamingResponse:
+    """
+    Stream generation as Server-Sent Events.
+
+    Each decoded piece is sent as ``{"token": ...}``. The last event carries
+    ``{"done": true, **finalize(raw_output)}`` so clients still receive the
+    post-processed answer (and citations) once generation finishes. If
+    generation fails or stalls, the last event is ``{"error": ...}`` instead.
+    """
+    async def events():
+        stop_event = threading.Event()
+        streamer, done = start_response_stream(prompt, max_new_tokens, stop_event)
+        pieces = []
+        try:
+            while True:
+                try:
+                    piece = await asyncio.to_thread(next, streamer, None)
+                except queue.Empty:
+                    if done.running():
+                        yield _sse({"error": "Generation timed out"})
+                        return
+                    # Still queued behind other generations.
+                    if await request.is_disconnected():
+                        return
+                    continue
+                if piece is None:
+                    break
+                if await request.is_disconnected():
+                    return
+                pieces.append(piece)
+                yield _sse({"token": piece})
+
+            try:
+                await asyncio.wrap_future(done)
+            except Exception as e:
+                yield _sse({"error": f"Generation failed: {str(e)}"})
+                return
+            yield _sse({"done": True, **finalize("".join(pieces))})
+        finally:
+            # Client went away or stream finished: stop decoding either way.
+            stop_event.set()
+            done.cancel()
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
 # ===============================
 # HEALTH ENDPOINTS (kept from enhancement branch)
 # ===============================
@@ -144,42 +634,99 @@ def readiness_check():
 # ===============================
 # UPLOAD (NO AUTH, RETURNS session_id)
 # ===============================
+# Stateless, so one instance serves every upload.
+TEXT_SPLITTER = RecursiveCharacterTextSplitter(
+    chunk_size=1000,
+    chunk_overlap=100
+)
+
+
+class IndexedPdf:
+    __slots__ = ("page_count", "vectorstore", "__weakref__")
+
+    def __init__(self, page_count: int, vectorstore: FAISS):
+        self.page_count = page_count
+        self.vectorstore = vectorstore
+
+
+# SHA-256 of the PDF bytes -> IndexedPdf, for PDFs some live session still
+# holds. Re-uploading the same file reuses its (read-only) index instead of
+# parsing and indexing it again; entries vanish with their last session.
+indexed_pdfs: "weakref.WeakValueDictionary[str, IndexedPdf]" = weakref.WeakValueDictionary()
+
+
+# PDFs are parsed straight from the spooled upload; writing a copy to
+# uploads/ is only needed when the files should be kept (SAVE_UPLOADS=1).
+SAVE_UPLOADS = os.getenv("SAVE_UPLOADS", "0") == "1"
+
+
+def hash_upload(file: UploadFile, save_path=None) -> str:
+    """
+    SHA-256 of the upload, read in 1 MiB chunks (also copied to
+    *save_path* when given). Rewinds the upload for parsing.
+    """
+    digest = hashlib.sha256()
+    with open(save_path, "wb") if save_path else nullcontext() as buffer:
+        while chunk := file.file.read(1 << 20):
+            digest.update(chunk)
+            if buffer is not None:
+                buffer.write(chunk)
+    file.file.seek(0)
+    return digest.hexdigest()
+
+
+def index_pdf(stream, filename: str) -> IndexedPdf:
+    """Parse, split and index a PDF from a binary stream."""
+    # Same page text and 0-indexed "page" metadata as PyPDFLoader.
+    docs = [
+        Document(page_content=page.extract_text(), metadata={"source": filename, "page": i})
+        for i, page in enumerate(PdfReader(stream).pages)
+    ]
+
+    chunks = TEXT_SPLITTER.split_documents(docs)
+
+    vectorstore = move_index_to_gpu(
+        build_vectorstore(chunks, embedding_model, gpu=faiss_gpu_resources is not None)
+    )
+    return IndexedPdf(len(docs), vectorstore)
+
+
 @app.post("/upload")
 @limiter.limit("10/15 minutes")
 async def upload_file(request: Request, file: UploadFile = File(...)):
     if not file.filename.lower().endswith(".pdf"):
         return {"error": "Only PDF files are supported"}
 
-    session_id = str(uuid4())
-    upload_dir = "uploads"
-    os.makedirs(upload_dir, exist_ok=True)
-    file_path = os.path.join(upload_dir, f"{uuid4().hex}_{file.filename}")
+    # One random id serves as both the session id and the stored file prefix.
+    upload_id = uuid4()
+    session_id = str(upload_id)
+    file_path = None
+    if SAVE_UPLOADS:
+        upload_dir = "uploads"
+        os.makedirs(upload_dir, exist_ok=True)
+        file_path = os.path.join(upload_dir, f"{upload_id.hex}_{file.filename}")
 
     try:
-        with open(file_path, "wb") as buffer:
-            buffer.write(await file.read())
-
-        loader = PyPDFLoader(file_path)
-        docs = loader.load()
-
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=100
+        # Hashing, parsing, splitting and embedding are blocking — run them
+        # off the event loop.
+        digest = await asyncio.to_thread(hash_upload, file, file_path)
+
+        pdf = indexed_pdfs.get(digest)
+        if pdf is None:
+            pdf = await asyncio.to_thread(index_pdf, file.file, file.filename)
+            indexed_pdfs[digest] = pdf
+
+        sessions[session_id] = SessionState(
+            vectorstores=[pdf.vectorstore],
+            filename=file.filename,
+            last_accessed=time.time(),
+            pdf=pdf,
         )
-        chunks = splitter.split_documents(docs)
-
-        vectorstore = FAISS.from_documents(chunks, embedding_model)
-
-        sessions[session_id] = {
-            "vectorstores": [vectorstore],
-            "filename": file.filename,
-            "last_accessed": time.time()
-        }
 
         return {
             "message": "PDF uploaded and processed",
             "session_id": session_id,
-            "page_count": len(docs)
+            "page_count": pdf.page_count
         }
 
     except Exception as e:
@@ -191,32 +738,32 @@ async def upload_file(request: Request, file: UploadFile = File(...)):
 # ===============================
 @app.post("/ask")
 @limiter.limit("60/15 minutes")
-def ask_question(request: Request, data: AskRequest):
-    cleanup_expired_sessions()
-
+async def ask_question(request: Request, data: AskRequest):
     if not data.session_ids:
         return {"answer": "No session selected.", "citations": []}
 
-    # Update last_accessed for all sessions
+    # Gather retrieved docs with their session filenames
+    # (touch() also refreshes last_accessed)
+    selected = []
     for sid in data.session_ids:
-        session = sessions.get(sid)
+        session = sessions.touch(sid)
         if session:
-            session["last_accessed"] = time.time()
+            selected.append((sid, session))
+
+    retrieved_per_session = await asyncio.to_thread(
+        search_vectorstores,
+        [session.vectorstores[0] for _, session in selected], data.question, k=4,
+    )
 
-    # Gather retrieved docs with their session filenames
     docs_with_meta = []
-    for sid in data.session_ids:
-        session = sessions.get(sid)
-        if session:
-            vs = session["vectorstores"][0]
-            filename = session.get("filename", "unknown")
-            retrieved = vs.similarity_search(data.question, k=4)
-            for doc in retrieved:
-                docs_with_meta.append({
-                    "doc": doc,
-                    "filename": filename,
-                    "sid": sid
-                })
+    for (sid, session), retrieved in zip(selected, retrieved_per_session):
+        filename = session.filename
+        for doc in retrieved:
+            docs_with_meta.append({
+                "doc": doc,
+                "filename": filename,
+                "sid": sid
+            })
 
     if not docs_with_meta:
         return {"answer": "No relevant context found.", "citations": []}
@@ -224,7 +771,7 @@ def ask_question(request: Request, data: AskRequest):
     # Build context with page annotations for the prompt
     context_parts = []
     for item in docs_with_meta:
-        # PyPDFLoader sets metadata["page"] as 0-indexed
+        # metadata["page"] is 0-indexed (as with PyPDFLoader)
         raw_page = item["doc"].metadata.get("page", 0)
         page_num = int(raw_page) + 1  # Convert to 1-indexed
         context_parts.append(f"[Page {page_num}] {item['doc'].page_content}")
@@ -233,9 +780,6 @@ def ask_question(request: Request, data: AskRequest):
 
     # Use minimal prompt builder to reduce instruction echoing (upstream fix)
     prompt = build_ask_prompt(context=context, question=data.question)
-    raw_answer = generate_response(prompt, max_new_tokens=150)
-    # Strip any leaked prompt/context text from the raw output
-    clean_answer = extract_final_answer(raw_answer)
 
     # Build deduplicated, sorted citations
     seen = set()
@@ -253,7 +797,23 @@ def ask_question(request: Request, data: AskRequest):
 
     citations.sort(key=lambda c: (c["source"], c["page"]))
 
-    return {"answer": clean_answer, "citations": citations}
+    if data.stream:
+        return stream_sse(
+            request, prompt, 150,
+            lambda raw: {"answer": extract_final_answer(raw), "citations": citations},
+        )
+
+    # Only the answer is cached: citations name this request's session files,
+    # which are not part of the prompt (the same PDF can be uploaded under
+    # different names), so they are attached per request.
+    response = await cached_response(
+        "ans", prompt,
+        # Strip any leaked prompt/context text from the raw output
+        lambda raw: {"answer": extract_final_answer(raw)},
+        max_new_tokens=150,
+        cache_key=("ask", *data.session_ids),
+    )
+    return {**response, "citations": citations}
 
 
 # ===============================
@@ -261,34 +821,44 @@ def ask_question(request: Request, data: AskRequest):
 # ===============================
 @app.post("/summarize")
 @limiter.limit("15/15 minutes")
-def summarize_pdf(request: Request, data: SummarizeRequest):
-    cleanup_expired_sessions()
-
+async def summarize_pdf(request: Request, data: SummarizeRequest):
     if not data.session_ids:
         return {"summary": "No session selected."}
 
     vectorstores = []
     for sid in data.session_ids:
-        session = sessions.get(sid)
+        session = sessions.touch(sid)
         if session:
-            vectorstores.extend(session["vectorstores"])
+            vectorstores.extend(session.vectorstores)
 
     if not vectorstores:
         return {"summary": "No documents found."}
 
     docs = []
-    for vs in vectorstores:
-        docs.extend(vs.similarity_search("Summarize the document", k=6))
+    for retrieved in await asyncio.to_thread(
+        search_vectorstores, vectorstores, "Summarize the document", k=6
+    ):
+        docs.extend(retrieved)
 
     context = "\n\n".join([d.page_content for d in docs])
 
     # ── Build minimal summarization prompt ───────────────────────────────────
     prompt = build_summarize_prompt(context=context)
 
-    raw_summary = generate_response(prompt, max_new_tokens=300)
-    # Post-process: strip any leaked prompt/context text from the summary.
-    summary = extract_final_summary(raw_summary)
-    return {"summary": summary}
+    if data.stream:
+        return stream_sse(
+            request, prompt, 300,
+            lambda raw: {"summary": extract_final_summary(raw)},
+        )
+
+    return await cached_response(
+        "sum", prompt,
+        # Post-process: strip any leaked prompt/context text from the summary.
+        lambda raw: {"summary": extract_final_summary(raw)},
+        max_new_tokens=300,
+        cache_key=("summarize", *data.session_ids),
+        prompt_lookup=True,
+    )
 
 
 # ===============================
@@ -296,36 +866,47 @@ def summarize_pdf(request: Request, data: SummarizeRequest):
 # ===============================
 @app.post("/compare")
 @limiter.limit("10/15 minutes")
-def compare_documents(request: Request, data: CompareRequest):
-    cleanup_expired_sessions()
-
+async def compare_documents(request: Request, data: CompareRequest):
     if len(data.session_ids) < 2:
         return {"comparison": "Select at least 2 documents."}
 
-    contexts = []
+    # Each session holds exactly one document's index, so the per-document
+    # grouping comes straight from the session map: one retrieval per
+    # document, no walk over the docstore grouping chunks by metadata.
+    # Top chunks are retrieved from each document separately for a fair
+    # comparison.
+    query = "summarize the main topic, purpose, and key details of this document"
+    vectorstores = []
     for sid in data.session_ids:
-        session = sessions.get(sid)
+        session = sessions.touch(sid)
         if session:
-            vs = session["vectorstores"][0]
-            chunks = vs.similarity_search("main topics", k=4)
-            text = "\n".join([c.page_content for c in chunks])
-            contexts.append(text)
+            vectorstores.append(session.vectorstores[0])
 
-    # Retrieve top chunks from each document separately for fair comparison
-    query = "summarize the main topic, purpose, and key details of this document"
-    per_doc_contexts = []
-    for i, vs in enumerate(vectorstores):
-        chunks = vs.similarity_search(query, k=4)
-        text = "\n".join([c.page_content for c in chunks])
-        per_doc_contexts.append(text)
+    per_doc_contexts = [
+        "\n".join([c.page_content for c in chunks])
+        for chunks in await asyncio.to_thread(search_vectorstores, vectorstores, query, k=4)
+    ]
+
+    if len(per_doc_contexts) < 2:
+        return {"comparison": "Select at least 2 documents."}
 
     # ── Build minimal comparison prompt ───────────────────────────────────────
     prompt = build_compare_prompt(per_doc_contexts=per_doc_contexts)
 
-    raw = generate_response(prompt, max_new_tokens=400)
-    # Post-process: strip any leaked prompt/context text from the comparison.
-    comparison = extract_comparison(raw)
-    return {"comparison": comparison}
+    if data.stream:
+        return stream_sse(
+            request, prompt, 400,
+            lambda raw: {"comparison": extract_comparison(raw)},
+        )
+
+    return await cached_response(
+        "cmp", prompt,
+        # Post-process: strip any leaked prompt/context text from the comparison.
+        lambda raw: {"comparison": extract_comparison(raw)},
+        max_new_tokens=400,
+        cache_key=("compare", *data.session_ids),
+        prompt_lookup=True,
+    )
 
 
 @app.get("/health")
@@ -334,4 +915,15 @@ def health():
 
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=5000)
\ No newline at end of file
+    # loop/http "auto" pick uvloop + httptools when installed (uvicorn[standard]).
+    # Sessions and FAISS indexes live in process memory, so extra workers only
+    # help behind a sticky load balancer; UVICORN_WORKERS defaults to 1.
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=5000,
+        workers=int(os.getenv("UVICORN_WORKERS", "1")),
+        loop="auto",
+        http="auto",
+        access_log=False,
+    )
\ No newline at end of file
@@ -9,19 +9,23 @@ import pytest
 # Copied helpers (so tests don't need to import the full FastAPI app)
 # ---------------------------------------------------------------------------
 
-NUMERIC_KEYWORDS = [
+NUMERIC_KEYWORDS = frozenset({
     "percent", "percentage", "%", "score", "marks", "ratio",
     "rate", "result", "grade", "cgpa", "gpa"
-]
+})
+
+# One scan over the question instead of one substring search per keyword.
+_KW_RE = re.compile("|".join(map(re.escape, NUMERIC_KEYWORDS)), re.IGNORECASE)
+
+_PCT_RE = re.compile(r'\b\d+(?:\.\d+)?%')
 
 
 def is_numeric_question(question: str) -> bool:
-    q = question.lower()
-    return any(kw in q for kw in NUMERIC_KEYWORDS)
+    return _KW_RE.search(question) is not None
 
 
 def extract_percentage(text: str) -> str:
-    matches = re.findall(r'\b\d+(?:\.\d+)?%', text)
+    matches = _PCT_RE.findall(text)
     if matches:
         return matches[-1]
     return text
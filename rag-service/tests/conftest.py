@@ -2,13 +2,16 @@ import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from unittest.mock import MagicMock, patch
 import tempfile
+import time
 import os
 
 from database import Base, get_db
-from main import app
+from main import app, sessions
 from auth.models import User, UserRole  
 from auth.security import SecurityManager
+from utils.session_store import SessionState
 
 # Test database setup
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test_pdf_qa_bot.db"
@@ -172,4 +175,61 @@ startxref
         f.write(pdf_content)
         f.flush()
         yield f.name
-    os.unlink(f.name)
\ No newline at end of file
+    os.unlink(f.name)
+
+
+# ---------------------------------------------------------------------------
+# RAG endpoint fixtures (no GPU/model needed)
+# ---------------------------------------------------------------------------
+
+@pytest.fixture(scope="module")
+def generated_text():
+    """Raw output of the mocked ``generate_response``; override per test module."""
+    return "Mocked answer"
+
+
+@pytest.fixture(scope="module")
+def mock_generate(generated_text):
+    """``main.generate_response`` mocked to return *generated_text*."""
+    with patch("main.generate_response", return_value=generated_text) as m:
+        yield m
+
+
+@pytest.fixture(scope="module")
+def rag_client(mock_generate):
+    """
+    TestClient with model and embeddings mocked out.
+
+    Module-scoped: ``main`` is patched once for every test in a module; use
+    ``clear_sessions`` to reset state between tests.
+    """
+    with (
+        patch("main.embedding_model"),
+        patch("main.model"),
+        patch("main.tokenizer"),
+    ):
+        yield TestClient(app)
+
+
+@pytest.fixture
+def clear_sessions(rag_client, mock_generate):
+    """Start a test with no sessions and a fresh ``mock_generate`` call record."""
+    sessions.clear()
+    mock_generate.reset_mock()
+    yield
+    sessions.clear()
+
+
+@pytest.fixture
+def make_session():
+    """Factory for a session whose mocked vectorstore returns *docs*."""
+    def _make(docs, filename="test.pdf"):
+        mock_vs = MagicMock()
+        mock_vs.similarity_search.return_value = docs
+        mock_vs.similarity_search_by_vector.return_value = docs
+        return SessionState(
+            vectorstores=[mock_vs],
+            filename=filename,
+            last_accessed=time.time(),
+        )
+    return _make
@@ -0,0 +1,56 @@
+"""
+Tests for the generation micro-batcher (utils/batching.py).
+
+Validates that:
+- Concurrent submissions are grouped into one batch call
+- Every caller receives its own result
+- A failing batch raises in every caller of that batch
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils.batching import MicroBatcher
+
+
+class TestMicroBatcher:
+
+    def test_concurrent_items_share_a_batch(self):
+        batches = []
+
+        def run_batch(items):
+            batches.append(list(items))
+            return [item * 10 for item in items]
+
+        batcher = MicroBatcher(run_batch, max_batch=4, max_wait=0.5)
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(batcher.submit, range(4)))
+
+        assert results == [0, 10, 20, 30]
+        assert max(len(b) for b in batches) > 1
+
+    def test_batch_size_is_capped(self):
+        batches = []
+
+        def run_batch(items):
+            batches.append(list(items))
+            return items
+
+        batcher = MicroBatcher(run_batch, max_batch=2, max_wait=0.2)
+
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            results = list(pool.map(batcher.submit, range(5)))
+
+        assert results == list(range(5))
+        assert max(len(b) for b in batches) <= 2
+
+    def test_errors_reach_every_caller(self):
+        def run_batch(items):
+            raise RuntimeError("model failed")
+
+        batcher = MicroBatcher(run_batch, max_batch=2, max_wait=0.01)
+
+        with pytest.raises(RuntimeError, match="model failed"):
+            batcher.submit("prompt")
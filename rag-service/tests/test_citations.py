@@ -7,13 +7,19 @@ Validates that:
 - Citations are deduplicated (same page from same doc only once)
 - Citations are sorted by source then page number
 - No session / empty session returns citations: []
+- A cached answer is returned with the asking session's own citations
+- Cache hits do not queue behind running generations
 """
 
+import threading
+
 import pytest
-from unittest.mock import MagicMock, patch
-from fastapi.testclient import TestClient
+from unittest.mock import patch
 from langchain_core.documents import Document
 
+# Every test starts with an empty session store (the client is module-scoped).
+pytestmark = pytest.mark.usefixtures("clear_sessions")
+
 
 # ---------------------------------------------------------------------------
 # Helpers
@@ -24,34 +30,17 @@ def make_doc(content: str, page: int, source: str = "test.pdf") -> Document:
     return Document(page_content=content, metadata={"page": page, "source": source})
 
 
-def make_session(docs: list[Document], filename: str = "test.pdf"):
-    """Build a fake session dict with a mocked vectorstore."""
-    mock_vs = MagicMock()
-    mock_vs.similarity_search.return_value = docs
+class DictResponseCache:
+    """In-memory stand-in for ``ResponseCache`` (same get/set interface)."""
 
-    import time
-    return {
-        "vectorstores": [mock_vs],
-        "filename": filename,
-        "last_accessed": time.time(),
-    }
+    def __init__(self):
+        self.data = {}
 
+    def get(self, key):
+        return self.data.get(key)
 
-# ---------------------------------------------------------------------------
-# Fixtures
-# ---------------------------------------------------------------------------
-
-@pytest.fixture
-def client():
-    """TestClient with model and embeddings mocked out (no GPU/model needed)."""
-    with (
-        patch("main.embedding_model"),
-        patch("main.model"),
-        patch("main.tokenizer"),
-        patch("main.generate_response", return_value="Mocked answer"),
-    ):
-        from main import app
-        yield TestClient(app)
+    def set(self, key, response):
+        self.data[key] = response
 
 
 # ---------------------------------------------------------------------------
@@ -60,13 +49,13 @@ def client():
 
 class TestCitationsInAskEndpoint:
 
-    def test_ask_returns_citations_field(self, client):
+    def test_ask_returns_citations_field(self, rag_client, make_session):
         """Response must always include a `citations` key."""
         from main import sessions
         sid = "sid-001"
         sessions[sid] = make_session([make_doc("Some text about topic A.", page=2)])
 
-        response = client.post("/ask", json={
+        response = rag_client.post("/ask", json={
             "question": "What is topic A?",
             "session_ids": [sid]
         })
@@ -75,14 +64,14 @@ class TestCitationsInAskEndpoint:
         body = response.json()
         assert "citations" in body
 
-    def test_page_numbers_are_one_indexed(self, client):
+    def test_page_numbers_are_one_indexed(self, rag_client, make_session):
         """PyPDFLoader returns page=0 for the first page; we must expose page=1."""
         from main import sessions
         sid = "sid-002"
         # page=0 in metadata → should come back as page=1 in citation
         sessions[sid] = make_session([make_doc("First page content.", page=0)])
 
-        response = client.post("/ask", json={
+        response = rag_client.post("/ask", json={
             "question": "What is on the first page?",
             "session_ids": [sid]
         })
@@ -91,7 +80,7 @@ class TestCitationsInAskEndpoint:
         pages = [c["page"] for c in body["citations"]]
         assert 1 in pages, f"Expected page 1 (1-indexed) but got: {pages}"
 
-    def test_citations_deduplicated(self, client):
+    def test_citations_deduplicated(self, rag_client, make_session):
         """Multiple chunks from the same page must produce one citation entry."""
         from main import sessions
         sid = "sid-003"
@@ -102,7 +91,7 @@ class TestCitationsInAskEndpoint:
         ]
         sessions[sid] = make_session(docs)
 
-        response = client.post("/ask", json={
+        response = rag_client.post("/ask", json={
             "question": "What is on page 5?",
             "session_ids": [sid]
         })
@@ -112,7 +101,7 @@ class TestCitationsInAskEndpoint:
         # Page 5 should appear only once
         assert pages.count(5) == 1
 
-    def test_citations_sorted_by_source_then_page(self, client):
+    def test_citations_sorted_by_source_then_page(self, rag_client, make_session):
         """Citations must be sorted: first by source filename, then by page."""
         from main import sessions
 
@@ -127,7 +116,7 @@ class TestCitationsInAskEndpoint:
             filename="a_doc.pdf"
         )
 
-        response = client.post("/ask", json={
+        response = rag_client.post("/ask", json={
             "question": "What are the main topics?",
             "session_ids": [sid_a, sid_b]
         })
@@ -147,9 +136,9 @@ class TestCitationsInAskEndpoint:
         b_pages = [pages[i] for i in b_indices]
         assert b_pages == sorted(b_pages)
 
-    def test_no_session_returns_empty_citations(self, client):
+    def test_no_session_returns_empty_citations(self, rag_client):
         """Empty session_ids should return citations: []."""
-        response = client.post("/ask", json={
+        response = rag_client.post("/ask", json={
             "question": "Anything?",
             "session_ids": []
         })
@@ -158,9 +147,9 @@ class TestCitationsInAskEndpoint:
         assert "citations" in body
         assert body["citations"] == []
 
-    def test_invalid_session_returns_empty_citations(self, client):
+    def test_invalid_session_returns_empty_citations(self, rag_client):
         """A session_id that does not exist should return citations: []."""
-        response = client.post("/ask", json={
+        response = rag_client.post("/ask", json={
             "question": "Anything?",
             "session_ids": ["nonexistent-session-id"]
         })
@@ -169,7 +158,7 @@ class TestCitationsInAskEndpoint:
         assert "citations" in body
         assert body["citations"] == []
 
-    def test_citation_source_matches_uploaded_filename(self, client):
+    def test_citation_source_matches_uploaded_filename(self, rag_client, make_session):
         """The `source` field in citations must match the original filename."""
         from main import sessions
         sid = "sid-006"
@@ -178,7 +167,7 @@ class TestCitationsInAskEndpoint:
             filename="annual_report_2025.pdf"
         )
 
-        response = client.post("/ask", json={
+        response = rag_client.post("/ask", json={
             "question": "What does the report say?",
             "session_ids": [sid]
         })
@@ -187,7 +176,7 @@ class TestCitationsInAskEndpoint:
         assert len(body["citations"]) > 0
         assert body["citations"][0]["source"] == "annual_report_2025.pdf"
 
-    def test_multiple_documents_all_cited(self, client):
+    def test_multiple_documents_all_cited(self, rag_client, make_session):
         """When asking across 2 PDFs, both should appear in citations."""
         from main import sessions
 
@@ -202,7 +191,7 @@ class TestCitationsInAskEndpoint:
             filename="doc_y.pdf"
         )
 
-        response = client.post("/ask", json={
+        response = rag_client.post("/ask", json={
             "question": "Compare the documents.",
             "session_ids": [sid_x, sid_y]
         })
@@ -211,3 +200,64 @@ class TestCitationsInAskEndpoint:
         sources = {c["source"] for c in body["citations"]}
         assert "doc_x.pdf" in sources
         assert "doc_y.pdf" in sources
+
+    def test_each_session_retrieved_once(self, rag_client, make_session):
+        """/ask must run exactly one retrieval per selected session."""
+        from main import sessions
+
+        sid_x = "sid-008x"
+        sid_y = "sid-008y"
+        sessions[sid_x] = make_session([make_doc("Doc X content.", page=0)])
+        sessions[sid_y] = make_session([make_doc("Doc Y content.", page=0)])
+
+        rag_client.post("/ask", json={
+            "question": "What is covered?",
+            "session_ids": [sid_x, sid_y]
+        })
+
+        for sid in (sid_x, sid_y):
+            vs = sessions[sid].vectorstores[0]
+            assert vs.similarity_search_by_vector.call_count == 1
+            vs.similarity_search.assert_not_called()
+            vs.similarity_search_with_score.assert_not_called()
+
+    def test_cached_answer_cites_the_asking_session(self, rag_client, make_session, mock_generate):
+        """The same PDF uploaded under two names yields one prompt (one cache
+        entry), but each user must only ever see their own filename."""
+        from main import sessions
+        docs = [make_doc("Shared content.", page=0)]
+        sessions["sid-009a"] = make_session(docs, filename="mine.pdf")
+        sessions["sid-009b"] = make_session(docs, filename="theirs.pdf")
+
+        with patch("main.response_cache", DictResponseCache()):
+            first = rag_client.post("/ask", json={
+                "question": "What is shared?",
+                "session_ids": ["sid-009a"]
+            })
+            second = rag_client.post("/ask", json={
+                "question": "What is shared?",
+                "session_ids": ["sid-009b"]
+            })
+
+        assert mock_generate.call_count == 1  # second request was a cache hit
+        assert first.json()["citations"] == [{"page": 1, "source": "mine.pdf"}]
+        assert second.json()["citations"] == [{"page": 1, "source": "theirs.pdf"}]
+        assert second.json()["answer"] == first.json()["answer"]
+
+    def test_cache_hit_does_not_wait_for_generation(self, rag_client, make_session):
+        """A cached answer is served even while GENERATE_POOL is busy."""
+        from main import GENERATE_POOL, sessions
+        sessions["sid-010"] = make_session([make_doc("Cached content.", page=0)])
+        request = {"question": "What is cached?", "session_ids": ["sid-010"]}
+        release = threading.Event()
+
+        with patch("main.response_cache", DictResponseCache()):
+            rag_client.post("/ask", json=request)
+            busy = GENERATE_POOL.submit(release.wait, 10)
+            try:
+                response = rag_client.post("/ask", json=request)
+                assert not busy.done()
+            finally:
+                release.set()
+
+        assert response.json()["answer"] == "Mocked answer"
@@ -0,0 +1,104 @@
+"""
+Tests for the /compare endpoint.
+
+Validates that:
+- Fewer than 2 selected (or existing) sessions are rejected
+- Each selected document is retrieved exactly once, from its own index
+- The prompt contains one block per document, in selection order
+- A streamed comparison ends with an error event if generation fails
+"""
+
+import pytest
+from concurrent.futures import Future
+from unittest.mock import patch
+from langchain_core.documents import Document
+
+# Every test starts with an empty session store (the client is module-scoped).
+pytestmark = pytest.mark.usefixtures("clear_sessions")
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def chunk(text: str) -> list[Document]:
+    """A single retrieved chunk on the first page."""
+    return [Document(page_content=text, metadata={"page": 0})]
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+@pytest.fixture(scope="module")
+def generated_text():
+    """Raw model output, with the marker the post-processor strips."""
+    return "Comparison: Both discuss X."
+
+
+# ---------------------------------------------------------------------------
+# Tests
+# ---------------------------------------------------------------------------
+
+class TestCompareEndpoint:
+
+    def test_requires_two_sessions(self, rag_client):
+        response = rag_client.post("/compare", json={"session_ids": ["only-one"]})
+
+        assert response.status_code == 200
+        assert response.json()["comparison"] == "Select at least 2 documents."
+
+    def test_unknown_sessions_are_rejected(self, rag_client):
+        response = rag_client.post("/compare", json={"session_ids": ["nope-1", "nope-2"]})
+
+        assert response.json()["comparison"] == "Select at least 2 documents."
+
+    def test_each_document_retrieved_once(self, rag_client, mock_generate, make_session):
+        from main import sessions
+        sessions["cmp-a"] = make_session(chunk("Alpha content."), "a.pdf")
+        sessions["cmp-b"] = make_session(chunk("Beta content."), "b.pdf")
+
+        response = rag_client.post("/compare", json={"session_ids": ["cmp-a", "cmp-b"]})
+
+        assert response.status_code == 200
+        assert response.json()["comparison"] == "Both discuss X."
+        for sid in ("cmp-a", "cmp-b"):
+            assert sessions[sid].vectorstores[0].similarity_search_by_vector.call_count == 1
+
+        prompt = mock_generate.call_args[0][0]
+        assert prompt.index("Doc1: Alpha content.") < prompt.index("Doc2: Beta content.")
+
+    def test_stream_returns_event_stream(self, rag_client, mock_generate, make_session):
+        from main import sessions
+        sessions["cmp-s1"] = make_session(chunk("Alpha content."), "a.pdf")
+        sessions["cmp-s2"] = make_session(chunk("Beta content."), "b.pdf")
+
+        done = Future()
+        done.set_result(None)
+        pieces = iter(["Comparison: ", "Both discuss X."])
+
+        with patch("main.start_response_stream", return_value=(pieces, done)):
+            response = rag_client.post(
+                "/compare", json={"session_ids": ["cmp-s1", "cmp-s2"], "stream": True}
+            )
+
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert '"done":true' in response.text
+        assert '"comparison":"Both discuss X."' in response.text
+        mock_generate.assert_not_called()
+
+    def test_stream_reports_generation_error(self, rag_client, make_session):
+        from main import sessions
+        sessions["cmp-e1"] = make_session(chunk("Alpha content."), "a.pdf")
+        sessions["cmp-e2"] = make_session(chunk("Beta content."), "b.pdf")
+
+        with (
+            patch("main.encode_prompt", return_value={}),
+            patch("main.model.generate", side_effect=RuntimeError("CUDA out of memory")),
+        ):
+            response = rag_client.post(
+                "/compare", json={"session_ids": ["cmp-e1", "cmp-e2"], "stream": True}
+            )
+
+        assert '"error":"Generation failed: CUDA out of memory"' in response.text
+        assert '"done":true' not in response.text
@@ -0,0 +1,147 @@
+"""
+Tests for the disk-backed embedding cache (utils/embedding_cache.py).
+
+Validates that:
+- Only texts not seen before reach the underlying model
+- Cached vectors survive reopening the database (i.e. a restart)
+- Switching the model name never returns another model's vectors
+- The oldest vectors are evicted beyond ``max_rows``, across reopens too
+- Queries skip the disk cache
+- A locked or closed database falls back to the model instead of raising
+"""
+
+import sqlite3
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from utils.embedding_cache import DiskCachedEmbeddings
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+class CountingEmbeddings(Embeddings):
+    """Embeds a text as [len(text), 1.0] and records what it was asked for."""
+
+    def __init__(self):
+        self.calls: list[str] = []
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.calls.extend(texts)
+        return [[float(len(t)), 1.0] for t in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "embeddings.db")
+
+
+# ---------------------------------------------------------------------------
+# Tests
+# ---------------------------------------------------------------------------
+
+class TestDiskCachedEmbeddings:
+
+    def test_only_misses_are_embedded(self, db_path):
+        base = CountingEmbeddings()
+        cache = DiskCachedEmbeddings(base, db_path, "model-a")
+
+        cache.embed_documents(["alpha", "beta"])
+        vectors = cache.embed_documents(["beta", "gamma", "gamma"])
+
+        assert base.calls == ["alpha", "beta", "gamma"]
+        assert vectors == [[4.0, 1.0], [5.0, 1.0], [5.0, 1.0]]
+
+    def test_vectors_persist_across_instances(self, db_path):
+        DiskCachedEmbeddings(CountingEmbeddings(), db_path, "model-a").embed_documents(["hello"])
+
+        base = CountingEmbeddings()
+        vectors = DiskCachedEmbeddings(base, db_path, "model-a").embed_documents(["hello"])
+
+        assert base.calls == []
+        assert vectors == [[5.0, 1.0]]
+
+    def test_model_name_is_part_of_the_key(self, db_path):
+        DiskCachedEmbeddings(CountingEmbeddings(), db_path, "model-a").embed_documents(["hello"])
+
+        base = CountingEmbeddings()
+        DiskCachedEmbeddings(base, db_path, "model-b").embed_documents(["hello"])
+
+        assert base.calls == ["hello"]
+
+    def test_oldest_rows_evicted_beyond_max_rows(self, db_path):
+        cache = DiskCachedEmbeddings(CountingEmbeddings(), db_path, "model-a", max_rows=2)
+        cache.embed_documents(["alpha", "beta"])
+        cache.embed_documents(["gamma"])
+
+        base = CountingEmbeddings()
+        reopened = DiskCachedEmbeddings(base, db_path, "model-a", max_rows=2)
+        reopened.embed_documents(["beta", "gamma"])
+        assert base.calls == []
+
+        reopened.embed_documents(["alpha"])  # evicted earlier; now evicts beta
+        reopened.embed_documents(["beta"])
+        assert base.calls == ["alpha", "beta"]
+
+    def test_queries_are_not_cached(self, db_path):
+        base = CountingEmbeddings()
+        cache = DiskCachedEmbeddings(base, db_path, "model-a")
+
+        cache.embed_query("hello")
+        cache.embed_query("hello")
+
+        assert base.calls == ["hello", "hello"]
+        assert cache.embed_documents(["hello"]) == [[5.0, 1.0]]
+        assert base.calls == ["hello", "hello", "hello"]
+
+
+class TestDatabaseErrors:
+
+    def test_locked_database_falls_back_to_model(self, db_path):
+        base = CountingEmbeddings()
+        cache = DiskCachedEmbeddings(base, db_path, "model-a", timeout=0)
+        cache.embed_documents(["alpha"])
+
+        other = sqlite3.connect(db_path)
+        other.execute("BEGIN EXCLUSIVE")
+        try:
+            vectors = cache.embed_documents(["alpha", "beta"])
+        finally:
+            other.rollback()
+            other.close()
+
+        assert vectors == [[5.0, 1.0], [4.0, 1.0]]
+        assert base.calls == ["alpha", "alpha", "beta"]
+
+    def test_failed_write_is_retried_later(self, db_path):
+        base = CountingEmbeddings()
+        cache = DiskCachedEmbeddings(base, db_path, "model-a", timeout=0)
+
+        other = sqlite3.connect(db_path)
+        other.execute("BEGIN EXCLUSIVE")
+        try:
+            cache.embed_documents(["alpha"])
+        finally:
+            other.rollback()
+            other.close()
+        cache.embed_documents(["alpha"])
+        cache.embed_documents(["alpha"])
+
+        assert base.calls == ["alpha", "alpha"]
+
+    def test_closed_connection_falls_back_to_model(self, db_path):
+        base = CountingEmbeddings()
+        cache = DiskCachedEmbeddings(base, db_path, "model-a")
+        cache._conn.close()
+
+        assert cache.embed_documents(["alpha"]) == [[5.0, 1.0]]
+        assert base.calls == ["alpha"]
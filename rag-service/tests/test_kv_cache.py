@@ -0,0 +1,162 @@
+"""
+Tests for prompt KV-cache reuse (utils/kv_cache.py).
+
+Validates that:
+- A lookup returns a copy cropped to the shared prefix, never the stored entry
+- Short shared prefixes and unknown keys miss
+- At least one prompt token is always left for generate() to prefill
+- Entries are LRU-evicted against the byte budget
+- Discarding a session drops every entry whose key includes it
+"""
+
+from types import SimpleNamespace
+
+import torch
+
+from utils.kv_cache import PrefixKVCache
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+# 2 (K and V) × 1 layer × 1 head × head_dim 2 × 4 bytes (float32)
+BYTES_PER_TOKEN = 16
+
+
+class FakeKV:
+    """DynamicCache stand-in: one value per cached token, cropped in place."""
+
+    def __init__(self, seq_len: int):
+        self.values = torch.arange(seq_len)
+
+    def crop(self, max_length: int) -> None:
+        self.values = self.values[:max_length]
+
+
+def make_cache(max_tokens: int = 100) -> PrefixKVCache:
+    config = SimpleNamespace(num_hidden_layers=1, num_attention_heads=1, hidden_size=2)
+    return PrefixKVCache(
+        config, torch.float32, max_tokens * BYTES_PER_TOKEN, min_reuse_tokens=4
+    )
+
+
+def ids(n: int, offset: int = 0) -> torch.Tensor:
+    return torch.arange(offset, offset + n)
+
+
+def store(cache: PrefixKVCache, key, n: int) -> FakeKV:
+    past = FakeKV(n)
+    cache.store(key, ids(n), past)
+    return past
+
+
+# ---------------------------------------------------------------------------
+# Tests
+# ---------------------------------------------------------------------------
+
+class TestLookup:
+
+    def test_entry_size_comes_from_config(self):
+        assert make_cache().bytes_per_token == BYTES_PER_TOKEN
+
+    def test_prefix_hit_is_a_cropped_copy(self):
+        cache = make_cache()
+        stored = store(cache, ("ask", "s1"), 10)
+
+        # Same first 6 tokens, then a different question.
+        prompt = torch.cat([ids(6), ids(5, offset=100)])
+        past = cache.lookup(("ask", "s1"), prompt)
+
+        assert past is not stored
+        assert past.values.tolist() == list(range(6))
+        assert stored.values.tolist() == list(range(10))
+
+    def test_repeated_prompt_leaves_one_token_uncached(self):
+        cache = make_cache()
+        store(cache, ("summarize", "s1"), 10)
+
+        past = cache.lookup(("summarize", "s1"), ids(10))
+
+        assert len(past.values) == 9
+
+    def test_short_shared_prefix_misses(self):
+        cache = make_cache()
+        store(cache, ("ask", "s1"), 10)
+
+        prompt = torch.cat([ids(3), ids(7, offset=100)])
+
+        assert cache.lookup(("ask", "s1"), prompt) is None
+
+    def test_unknown_key_misses(self):
+        cache = make_cache()
+        store(cache, ("ask", "s1"), 10)
+
+        assert cache.lookup(("ask", "s2"), ids(10)) is None
+
+
+class TestEviction:
+
+    def test_oldest_entry_evicted_over_budget(self):
+        cache = make_cache(max_tokens=25)
+        store(cache, ("ask", "a"), 10)
+        store(cache, ("ask", "b"), 10)
+        store(cache, ("ask", "c"), 10)
+
+        assert cache.lookup(("ask", "a"), ids(10)) is None
+        assert cache.lookup(("ask", "b"), ids(10)) is not None
+        assert cache.lookup(("ask", "c"), ids(10)) is not None
+
+    def test_lookup_refreshes_recency(self):
+        cache = make_cache(max_tokens=25)
+        store(cache, ("ask", "a"), 10)
+        store(cache, ("ask", "b"), 10)
+        cache.lookup(("ask", "a"), ids(10))
+        store(cache, ("ask", "c"), 10)
+
+        assert cache.lookup(("ask", "a"), ids(10)) is not None
+        assert cache.lookup(("ask", "b"), ids(10)) is None
+
+    def test_replacing_a_key_does_not_double_count(self):
+        cache = make_cache(max_tokens=25)
+        store(cache, ("ask", "a"), 10)
+        store(cache, ("ask", "a"), 12)
+        store(cache, ("ask", "b"), 10)
+
+        assert cache.lookup(("ask", "a"), ids(12)) is not None
+
+    def test_entry_larger_than_budget_is_not_stored(self):
+        cache = make_cache(max_tokens=25)
+        store(cache, ("ask", "a"), 10)
+        store(cache, ("ask", "huge"), 30)
+
+        assert cache.lookup(("ask", "huge"), ids(30)) is None
+        assert cache.lookup(("ask", "a"), ids(10)) is not None
+
+
+class TestDiscardSession:
+
+    def test_drops_every_key_with_the_session(self):
+        cache = make_cache(max_tokens=30)
+        store(cache, ("ask", "s1"), 10)
+        store(cache, ("compare", "s1", "s2"), 10)
+        store(cache, ("ask", "s2"), 10)
+
+        cache.discard_session("s1")
+
+        assert cache.lookup(("ask", "s1"), ids(10)) is None
+        assert cache.lookup(("compare", "s1", "s2"), ids(10)) is None
+        assert cache.lookup(("ask", "s2"), ids(10)) is not None
+
+    def test_discarded_bytes_are_freed(self):
+        cache = make_cache(max_tokens=30)
+        store(cache, ("ask", "s1"), 10)
+        store(cache, ("summarize", "s1"), 10)
+        store(cache, ("ask", "s2"), 10)
+
+        cache.discard_session("s1")
+        store(cache, ("ask", "s3"), 10)
+        store(cache, ("ask", "s4"), 10)
+
+        # 30 tokens fit again: nothing else had to be evicted.
+        assert cache.lookup(("ask", "s2"), ids(10)) is not None
@@ -0,0 +1,205 @@
+"""
+Tests for LLM output post-processing (utils/postprocess.py).
+
+Validates that:
+- Text after the last terminal marker is kept
+- Already-clean output gives the same result as the full pipeline
+- Echoed instruction / context-header lines are dropped, other lines kept,
+  whatever line breaks (CRLF, CR, U+2028, ...) separate them
+- Inline instruction sentences are dropped
+- Whitespace and spaced-out letters are normalised
+- Empty or None output falls back to the "not found" message; other
+  non-string output (even unhashable) is cleaned as its ``str()``
+- Repeated outputs are served from the result cache, separately per kind
+- The optional Hyperscan echo check agrees with the ``re`` patterns
+"""
+
+import pytest
+
+from utils import postprocess
+from utils.postprocess import extract_comparison, extract_final_answer, extract_final_summary
+
+
+class TestMarkerSplit:
+
+    def test_keeps_text_after_last_marker(self):
+        raw = "Answer the question.\nDocument: text\nQuestion: why?\nAnswer: Because of X."
+
+        assert extract_final_answer(raw) == "Because of X."
+
+    def test_plain_answer_is_unchanged(self):
+        assert extract_final_answer("The contract was signed in 2024.") == (
+            "The contract was signed in 2024."
+        )
+
+    def test_summary_and_comparison_markers(self):
+        assert extract_final_summary("Summary: Key point one.") == "Key point one."
+        assert extract_comparison("Comparison: Both discuss X.") == "Both discuss X."
+
+
+class TestFastPath:
+
+    def test_newline_after_sentence_still_goes_through_pipeline(self):
+        raw = "  The fee is 20 dollars.\nIt is due in May.  "
+
+        assert extract_final_answer(raw) == "The fee is 20 dollars. It is due in May."
+
+    def test_clean_multiline_output_is_unchanged(self):
+        raw = "Point one\nPoint two"
+
+        assert extract_final_summary(raw) == "Point one\nPoint two"
+
+
+class TestEchoLineFilter:
+
+    def test_drops_echoed_header_lines(self):
+        raw = "First line\nContext: leaked chunk\nSecond line\nQuestion: what?"
+
+        assert extract_final_answer(raw) == "First line\nSecond line"
+
+    def test_drops_indented_and_case_insensitive_echoes(self):
+        raw = "Real answer.\n   DOCUMENT: leaked\n  be brief and direct"
+
+        assert extract_final_answer(raw) == "Real answer."
+
+    def test_header_word_inside_a_line_is_kept(self):
+        raw = "The Context: section explains it."
+
+        assert extract_final_answer(raw) == "The Context: section explains it."
+
+    def test_echo_pattern_does_not_span_lines(self):
+        # "Context" alone on a line, ":" on the next — neither line is a header.
+        raw = "Context\n: the term is defined here."
+
+        assert extract_final_answer(raw) == "Context\n: the term is defined here."
+
+    def test_blank_lines_between_kept_lines_survive(self):
+        raw = "Point one\n\nDoc1: leaked\nPoint two"
+
+        assert extract_comparison(raw) == "Point one\n\nPoint two"
+
+    def test_echo_on_first_and_last_line_without_trailing_newline(self):
+        raw = "Context: a\r\nReal answer\r\nQuestion: b"
+
+        assert extract_final_answer(raw) == "Real answer"
+
+    def test_tab_indented_header_mid_text(self):
+        raw = "Real answer\n\tDocument excerpt: x\nMore"
+
+        assert extract_final_answer(raw) == "Real answer\nMore"
+
+    def test_crlf_line_endings_become_newlines(self):
+        assert extract_final_answer("Line one\r\nLine two") == "Line one\nLine two"
+
+    @pytest.mark.parametrize("sep", ["\r\n", "\r", "\x0b", "\x85", "\u2028"])
+    def test_echo_lines_split_by_any_line_break_are_dropped(self, sep):
+        raw = sep.join(["Real answer", "Context: leaked", "More"])
+
+        assert extract_final_answer(raw) == "Real answer\nMore"
+
+    def test_header_after_text_on_the_same_line_is_kept(self):
+        raw = "Real answer  Context: inline"
+
+        assert extract_final_answer(raw) == "Real answer Context: inline"
+
+
+    @pytest.mark.parametrize("echo", [
+        "Do not repeat the context.",
+        "DO NOT add anything",
+        "  do not invent facts",
+        "- Do NOT include the document",
+        "• do not use bullet points",
+        "* Do not guess",
+    ])
+    def test_do_not_instruction_variants_are_dropped(self, echo):
+        assert extract_final_answer(f"Real answer\n{echo}") == "Real answer"
+
+    def test_line_merely_starting_with_do_is_kept(self):
+        assert extract_final_answer("Real answer\nDonations are due in May") == (
+            "Real answer\nDonations are due in May"
+        )
+
+
+class TestSentenceFilter:
+
+    def test_drops_inline_instruction_sentence(self):
+        raw = "The fee is 20 dollars. Be brief and direct."
+
+        assert extract_final_answer(raw) == "The fee is 20 dollars."
+
+
+class TestNormalisation:
+
+    def test_collapses_spaces_and_blank_lines(self):
+        raw = "One  \t two\n\n\n\nThree"
+
+        assert extract_final_summary(raw) == "One two\n\nThree"
+
+    def test_joins_spaced_letters(self):
+        assert extract_final_answer("The course is from N P T E L.") == (
+            "The course is from NPTEL."
+        )
+
+    def test_leaves_two_letter_and_mixed_runs(self):
+        assert extract_final_answer("Options a b or a b c d5.") == "Options a b or abc d5."
+
+    def test_strips_repeated_leading_marker(self):
+        assert extract_final_answer("Answer: Answer - Yes.") == "Yes."
+
+
+class TestFallback:
+
+    def test_empty_output_falls_back(self):
+        assert extract_final_answer("") == "I could not find a relevant answer in the document."
+
+    def test_only_echo_falls_back(self):
+        assert extract_final_summary("Summarize the document below.") == (
+            "I could not generate a summary for this document."
+        )
+
+    def test_none_output_falls_back(self):
+        assert extract_comparison(None).startswith("I could not")
+
+    def test_unhashable_output_is_cleaned_as_its_str(self):
+        assert extract_final_answer(["a", "b"]) == "['a', 'b']"
+        assert extract_final_summary({"text": "x"}) == "{'text': 'x'}"
+
+
+class TestResultCache:
+
+    def test_repeated_output_is_served_from_cache(self):
+        postprocess._clean.cache_clear()
+        raw = "Answer: The fee is 20 dollars."
+
+        first = extract_final_answer(raw)
+        second = extract_final_answer(raw)
+
+        assert first == second == "The fee is 20 dollars."
+        assert postprocess._clean.cache_info().hits == 1
+
+    def test_kinds_are_cached_separately(self):
+        raw = "Summary: Key point one."
+
+        assert extract_final_summary(raw) == "Key point one."
+        assert extract_final_answer(raw) == "Summary: Key point one."
+
+
+class TestEchoScanner:
+
+    @pytest.mark.parametrize("text", [
+        "A clean answer.",
+        "First line\n  context: leaked",
+        "\x1cBE BRIEF",                    # Python's \s covers \x1c-\x1f
+        "\x85Return the value",
+        "Line one\rQuestion: not at a line start",
+        "Keep it short. \u212aeep the answer",  # Kelvin sign folds to "k"
+        "It is based solely on the provided text.",
+        "In 3\u20135 key points",
+    ])
+    def test_matches_re_fallback(self, text):
+        expected = bool(
+            postprocess._ECHO_LINE_RE.search(text)
+            or postprocess._SENTENCE_ECHO_RE.search(text)
+        )
+
+        assert postprocess._has_echo(text) is expected
@@ -0,0 +1,124 @@
+"""
+Tests for prompt tokenization (utils/prompt_encoding.py).
+
+Validates that:
+- Encoded ids equal a plain ``tokenizer(prompt, truncation=True, ...)`` call,
+  special tokens and truncation included
+- T5 (the default model's tokenizer class) uses the pre-tokenized pieces
+- Tokenizers that prepend "▁" to separately tokenized pieces fall back to
+  whole-prompt tokenization
+- Repeated context is tokenized once
+"""
+
+import string
+
+import pytest
+from transformers import LlamaTokenizer, T5Tokenizer
+
+from utils.prompt_encoding import PromptEncoder
+from utils.prompt_templates import (
+    PROMPT_INSTRUCTIONS,
+    build_ask_prompt,
+    build_compare_prompt,
+    build_summarize_prompt,
+)
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+CHARS = sorted(set(string.printable) - set(string.whitespace))
+
+
+def t5_tokenizer() -> T5Tokenizer:
+    """Real T5Tokenizer over a tiny character-level unigram vocabulary."""
+    vocab = [("<pad>", 0.0), ("</s>", 0.0), ("<unk>", 0.0), ("▁", -2.0)]
+    vocab += [(c, -5.0) for c in CHARS] + [("▁" + c, -4.0) for c in CHARS]
+    vocab += [("▁the", -1.0), ("▁document", -1.0), ("▁Question", -1.0)]
+    return T5Tokenizer(vocab=vocab, extra_ids=0)
+
+
+def llama_tokenizer() -> LlamaTokenizer:
+    """Real LlamaTokenizer over a character vocabulary (no merges)."""
+    vocab = {"<unk>": 0, "<s>": 1, "</s>": 2}
+    for c in CHARS + ["▁", "\n"]:
+        vocab.setdefault(c, len(vocab))
+    return LlamaTokenizer(vocab=vocab, merges=[], legacy=True)
+
+
+SAMPLES = [
+    build_ask_prompt(context="Alpha beta.\n\nGamma delta.", question="What is alpha?"),
+    build_summarize_prompt(context="Alpha beta.\n\nGamma delta."),
+    build_compare_prompt(per_doc_contexts=["Alpha beta.", "Gamma delta."]),
+]
+
+PROMPTS = [
+    build_ask_prompt(
+        context="[Page 1] The fee is 20 dollars.\n\n[Page 2] It is due in May.",
+        question="When is the fee due?",
+        conversation_context="User: hi",
+    ),
+    build_summarize_prompt(context="Revenue grew.\n\nCosts fell."),
+    build_compare_prompt(per_doc_contexts=["Doc one text.", "Doc two text."]),
+    "A prompt without any known instruction prefix.",
+]
+
+
+def make_encoder(tokenizer, max_length: int = 2048) -> PromptEncoder:
+    return PromptEncoder(tokenizer, PROMPT_INSTRUCTIONS, max_length, SAMPLES)
+
+
+def plain(tokenizer, prompt: str, max_length: int = 2048) -> list[int]:
+    return tokenizer(prompt, truncation=True, max_length=max_length)["input_ids"]
+
+
+# ---------------------------------------------------------------------------
+# Tests
+# ---------------------------------------------------------------------------
+
+class TestT5Tokenizer:
+
+    def test_uses_pre_tokenized_pieces(self):
+        encoder = make_encoder(t5_tokenizer())
+
+        assert encoder.fast and encoder.segmented
+
+    @pytest.mark.parametrize("prompt", PROMPTS)
+    def test_matches_plain_tokenizer_call(self, prompt):
+        tokenizer = t5_tokenizer()
+
+        assert make_encoder(tokenizer).encode(prompt) == plain(tokenizer, prompt)
+
+    def test_truncation_keeps_the_end_of_sequence_token(self):
+        tokenizer = t5_tokenizer()
+        prompt = PROMPTS[0]
+
+        ids = make_encoder(tokenizer, max_length=20).encode(prompt)
+
+        assert ids == plain(tokenizer, prompt, max_length=20)
+        assert len(ids) == 20 and ids[-1] == tokenizer.eos_token_id
+
+    def test_repeated_context_is_tokenized_once(self):
+        encoder = make_encoder(t5_tokenizer())
+        first = build_ask_prompt(context="Shared.\n\nContext.", question="One?")
+        second = build_ask_prompt(context="Shared.\n\nContext.", question="Two?")
+
+        encoder.encode(first)
+        encoder.encode(second)
+
+        assert encoder._segment_ids.cache_info().hits == 1
+
+
+class TestPrefixSpaceTokenizer:
+
+    def test_falls_back_to_whole_prompt(self):
+        encoder = make_encoder(llama_tokenizer())
+
+        assert not encoder.fast
+
+    @pytest.mark.parametrize("prompt", PROMPTS)
+    def test_matches_plain_tokenizer_call(self, prompt):
+        tokenizer = llama_tokenizer()
+
+        assert make_encoder(tokenizer).encode(prompt) == plain(tokenizer, prompt)
@@ -0,0 +1,100 @@
+"""
+Tests for the semantic retrieval cache (utils/query_cache.py).
+
+Validates that:
+- Exact repeats hit the cache; by default, close but different queries miss
+- A looser threshold lets near-identical query vectors hit
+- Dissimilar query vectors miss
+- The oldest entry is overwritten once the cache is full
+- Entries older than ``ttl`` no longer hit
+"""
+
+import numpy as np
+
+from utils.query_cache import SemanticQueryCache
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def unit(*values: float) -> np.ndarray:
+    v = np.asarray(values, dtype=np.float32)
+    return v / np.linalg.norm(v)
+
+
+# ---------------------------------------------------------------------------
+# Tests
+# ---------------------------------------------------------------------------
+
+class TestSemanticQueryCache:
+
+    def test_empty_cache_misses(self):
+        assert SemanticQueryCache().get(unit(1, 0, 0)) is None
+
+    def test_default_threshold_only_hits_repeats(self):
+        cache = SemanticQueryCache()
+        cache.put(unit(1, 0, 0), ["doc-a"])
+
+        assert cache.get(unit(1, 0, 0)) == ["doc-a"]
+        assert cache.get(unit(1, 0.1, 0)) is None  # cosine ~0.995
+
+    def test_exact_and_near_queries_hit(self):
+        cache = SemanticQueryCache(threshold=0.95)
+        cache.put(unit(1, 0, 0), ["doc-a"])
+
+        assert cache.get(unit(1, 0, 0)) == ["doc-a"]
+        assert cache.get(unit(1, 0.1, 0)) == ["doc-a"]
+
+    def test_dissimilar_query_misses(self):
+        cache = SemanticQueryCache(threshold=0.95)
+        cache.put(unit(1, 0, 0), ["doc-a"])
+
+        assert cache.get(unit(1, 1, 0)) is None
+
+    def test_best_match_is_returned(self):
+        cache = SemanticQueryCache(threshold=0.5)
+        cache.put(unit(1, 0, 0), ["doc-a"])
+        cache.put(unit(0, 1, 0), ["doc-b"])
+
+        assert cache.get(unit(0.2, 1, 0)) == ["doc-b"]
+
+    def test_oldest_entry_is_evicted(self):
+        cache = SemanticQueryCache(max_entries=2)
+        cache.put(unit(1, 0, 0), ["doc-a"])
+        cache.put(unit(0, 1, 0), ["doc-b"])
+        cache.put(unit(0, 0, 1), ["doc-c"])
+
+        assert cache.get(unit(1, 0, 0)) is None
+        assert cache.get(unit(0, 1, 0)) == ["doc-b"]
+        assert cache.get(unit(0, 0, 1)) == ["doc-c"]
+
+
+class TestTTL:
+
+    def test_expired_entry_misses(self):
+        cache = SemanticQueryCache(ttl=60)
+        cache.put(unit(1, 0, 0), ["doc-a"], now=1000)
+
+        assert cache.get(unit(1, 0, 0), now=1059) == ["doc-a"]
+        assert cache.get(unit(1, 0, 0), now=1060) is None
+
+    def test_expired_best_match_falls_back_to_live_entry(self):
+        cache = SemanticQueryCache(threshold=0.5, ttl=60)
+        cache.put(unit(1, 0, 0), ["old"], now=1000)
+        cache.put(unit(1, 0.5, 0), ["new"], now=1050)
+
+        assert cache.get(unit(1, 0, 0), now=1070) == ["new"]
+
+    def test_re_put_refreshes_the_entry(self):
+        cache = SemanticQueryCache(ttl=60)
+        cache.put(unit(1, 0, 0), ["doc-a"], now=1000)
+        cache.put(unit(1, 0, 0), ["doc-b"], now=1100)
+
+        assert cache.get(unit(1, 0, 0), now=1120) == ["doc-b"]
+
+    def test_no_ttl_never_expires(self):
+        cache = SemanticQueryCache()
+        cache.put(unit(1, 0, 0), ["doc-a"], now=0)
+
+        assert cache.get(unit(1, 0, 0), now=10**9) == ["doc-a"]
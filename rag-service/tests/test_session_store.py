@@ -0,0 +1,170 @@
+"""
+Tests for the sharded session store (utils/session_store.py).
+
+Validates that:
+- The store behaves like a dict for get / set / delete / iteration
+- touch() refreshes last_accessed and drops sessions that already expired
+- cleanup_expired() removes only idle sessions and re-schedules used ones
+- max_sessions evicts the least recently used session
+- pop / del / clear release per-session caches through on_expire too
+- A removed and re-added session keeps its full timeout
+"""
+
+import time
+
+import pytest
+
+from utils.session_store import SessionState, SessionStore
+
+
+def make_data(last_accessed: float) -> SessionState:
+    return SessionState(vectorstores=[], filename="test.pdf", last_accessed=last_accessed)
+
+
+class TestSessionStoreMapping:
+
+    def test_set_get_delete(self):
+        store = SessionStore(timeout=60)
+        store["a"] = make_data(time.time())
+
+        assert "a" in store
+        assert store["a"].filename == "test.pdf"
+        assert store.get("missing") is None
+        assert len(store) == 1
+
+        del store["a"]
+        assert "a" not in store
+        assert len(store) == 0
+
+    def test_iteration_and_clear(self):
+        store = SessionStore(timeout=60)
+        for sid in ("a", "b", "c"):
+            store[sid] = make_data(time.time())
+
+        assert sorted(store) == ["a", "b", "c"]
+
+        store.clear()
+        assert len(store) == 0
+        assert list(store) == []
+
+    def test_num_shards_must_be_power_of_two(self):
+        with pytest.raises(ValueError):
+            SessionStore(timeout=60, num_shards=12)
+
+
+class TestSessionStoreExpiry:
+
+    def test_touch_refreshes_last_accessed(self):
+        store = SessionStore(timeout=60)
+        store["a"] = make_data(time.time() - 30)
+
+        session = store.touch("a")
+
+        assert session is not None
+        assert time.time() - session.last_accessed < 1
+
+    def test_touch_drops_expired_session(self):
+        store = SessionStore(timeout=60)
+        store["a"] = make_data(time.time() - 120)
+
+        assert store.touch("a") is None
+        assert "a" not in store
+
+    def test_cleanup_removes_only_idle_sessions(self):
+        store = SessionStore(timeout=60)
+        now = time.time()
+        store["old"] = make_data(now - 120)
+        store["fresh"] = make_data(now)
+
+        removed = store.cleanup_expired(now=now)
+
+        assert removed == 1
+        assert "old" not in store
+        assert "fresh" in store
+
+    def test_cleanup_reschedules_touched_session(self):
+        store = SessionStore(timeout=60)
+        now = time.time()
+        store["a"] = make_data(now - 50)
+
+        # Used after being scheduled: the original deadline is now stale.
+        store["a"].last_accessed = now
+
+        assert store.cleanup_expired(now=now + 20) == 0
+        assert "a" in store
+
+        # Expires once the refreshed deadline has passed.
+        assert store.cleanup_expired(now=now + 61) == 1
+        assert "a" not in store
+
+    def test_on_expire_called_for_removed_sessions(self):
+        expired = []
+        store = SessionStore(timeout=60, on_expire=expired.append)
+        now = time.time()
+        store["old"] = make_data(now - 120)
+        store["stale"] = make_data(now - 120)
+        store["fresh"] = make_data(now)
+
+        store.cleanup_expired(now=now)
+        store.touch("fresh")
+
+        assert sorted(expired) == ["old", "stale"]
+
+    def test_max_sessions_evicts_least_recently_used(self):
+        evicted = []
+        store = SessionStore(timeout=60, on_expire=evicted.append, max_sessions=2)
+        now = time.time()
+        store["a"] = make_data(now - 30)
+        store["b"] = make_data(now - 20)
+
+        # "a" is used again, so "b" is now the least recently used.
+        store.touch("a")
+        store["c"] = make_data(now)
+
+        assert evicted == ["b"]
+        assert sorted(store) == ["a", "c"]
+
+
+class TestRemovalHook:
+
+    def test_pop_and_del_call_on_expire(self):
+        removed = []
+        store = SessionStore(timeout=60, on_expire=removed.append)
+        now = time.time()
+        store["a"] = make_data(now)
+        store["b"] = make_data(now)
+
+        assert store.pop("a").filename == "test.pdf"
+        del store["b"]
+
+        assert removed == ["a", "b"]
+
+    def test_missing_pop_does_not_call_on_expire(self):
+        removed = []
+        store = SessionStore(timeout=60, on_expire=removed.append)
+
+        assert store.pop("missing") is None
+        assert removed == []
+
+    def test_clear_calls_on_expire_for_every_session(self):
+        removed = []
+        store = SessionStore(timeout=60, on_expire=removed.append)
+        now = time.time()
+        for sid in ("a", "b", "c"):
+            store[sid] = make_data(now)
+
+        store.clear()
+
+        assert sorted(removed) == ["a", "b", "c"]
+        assert len(store) == 0
+
+    def test_re_added_session_is_not_expired_by_its_old_entry(self):
+        store = SessionStore(timeout=60)
+        now = time.time()
+        store["a"] = make_data(now - 50)
+        del store["a"]
+        store["a"] = make_data(now)
+
+        assert store.cleanup_expired(now=now + 20) == 0
+        assert "a" in store
+        assert store.cleanup_expired(now=now + 61) == 1
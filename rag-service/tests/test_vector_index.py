@@ -0,0 +1,76 @@
+"""
+Tests for FAISS index construction (utils/vector_index.py).
+
+Validates that:
+- Small PDFs get an exact flat index, large ones an HNSW index
+- Vectors are stored as float16
+- GPU-bound indexes are built flat, in a form FAISS can clone to the GPU
+- Similarity search over the built vectorstore returns the matching chunk
+"""
+
+import faiss
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from utils.vector_index import build_vectorstore
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+class OneHotEmbeddings(Embeddings):
+    """Embeds "chunk N" as the N-th unit vector."""
+
+    dim = 64
+
+    def _embed(self, text: str) -> list[float]:
+        vector = [0.0] * self.dim
+        vector[int(text.split()[-1]) % self.dim] = 1.0
+        return vector
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed(text)
+
+
+def make_chunks(n: int) -> list[Document]:
+    return [Document(page_content=f"chunk {i}", metadata={"page": i}) for i in range(n)]
+
+
+# ---------------------------------------------------------------------------
+# Tests
+# ---------------------------------------------------------------------------
+
+class TestBuildVectorstore:
+
+    def test_small_pdf_uses_flat_index(self):
+        vs = build_vectorstore(make_chunks(10), OneHotEmbeddings(), hnsw_min_chunks=50)
+
+        assert isinstance(vs.index, faiss.IndexScalarQuantizer)
+        assert vs.index.ntotal == 10
+        assert vs.index.sq.qtype == faiss.ScalarQuantizer.QT_fp16
+
+    def test_large_pdf_uses_hnsw_index(self):
+        vs = build_vectorstore(make_chunks(60), OneHotEmbeddings(), hnsw_min_chunks=50)
+
+        assert isinstance(vs.index, faiss.IndexHNSWSQ)
+        assert vs.index.hnsw.efSearch == 64
+        assert vs.index.ntotal == 60
+
+    def test_gpu_build_uses_plain_flat_index(self):
+        vs = build_vectorstore(make_chunks(60), OneHotEmbeddings(), hnsw_min_chunks=50, gpu=True)
+
+        assert type(vs.index) is faiss.IndexFlatL2
+        assert vs.index.ntotal == 60
+
+    def test_search_returns_matching_chunk(self):
+        embeddings = OneHotEmbeddings()
+        vs = build_vectorstore(make_chunks(60), embeddings, hnsw_min_chunks=50)
+
+        docs = vs.similarity_search_by_vector(embeddings.embed_query("chunk 7"), k=1)
+
+        assert docs[0].page_content == "chunk 7"
+        assert docs[0].metadata["page"] == 7
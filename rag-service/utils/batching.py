@@ -0,0 +1,85 @@
+"""
+utils/batching.py
+-----------------
+Micro-batching of concurrent generation requests.
+
+WHY THIS EXISTS
+---------------
+Each request thread used to call ``model.generate`` on its own prompt.
+Autoregressive decoding is memory-bandwidth bound — every step streams all
+model weights for a single sequence — so concurrent requests queue up
+behind each other while the GPU/CPU is mostly waiting on memory.
+
+``MicroBatcher`` collects requests that arrive within a short window (up to
+``max_batch`` of them) and hands them to one batched call, so the weights
+are read once per step for the whole batch.  Callers keep a blocking API:
+``submit`` returns that request's own result (or raises its error).
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable
+
+__all__ = ["MicroBatcher"]
+
+
+class MicroBatcher:
+    """
+    Run items submitted from many threads through one batch function.
+
+    Parameters
+    ----------
+    run_batch:
+        Called with a list of submitted items; must return one result per
+        item, in the same order.
+    max_batch:
+        Largest batch handed to *run_batch*.
+    max_wait:
+        Seconds to wait for more items after the first one arrives.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[list], list],
+        max_batch: int = 8,
+        max_wait: float = 0.01,
+    ):
+        self.run_batch = run_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: "queue.Queue[tuple[Any, Future]]" = queue.Queue()
+        threading.Thread(target=self._worker, name="micro-batcher", daemon=True).start()
+
+    def submit(self, item: Any) -> Any:
+        """Queue *item* and block until its result is ready."""
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future.result()
+
+    def _collect(self) -> list[tuple[Any, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker(self) -> None:
+        while True:
+            batch = self._collect()
+            try:
+                results = self.run_batch([item for item, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
@@ -0,0 +1,139 @@
+"""
+utils/embedding_cache.py
+------------------------
+Disk-backed cache in front of the embedding model.
+
+WHY THIS EXISTS
+---------------
+Every upload re-embeds all of its chunks, even when the same PDF (or a
+different PDF sharing pages) was embedded before, and the in-process query
+LRU in ``main.py`` is lost on every restart.
+
+``DiskCachedEmbeddings`` wraps any LangChain ``Embeddings`` and keeps each
+text's vector in a single SQLite file, keyed by
+``sha256(model name + text)``.  Only cache misses reach the model; new
+vectors are written in one transaction per call.
+
+The cache is strictly best-effort: any ``sqlite3.Error`` (e.g. "database is
+locked" while another worker process writes the same file) counts as a miss
+or a skipped write, and the vectors come from the base model.  Queries are
+not cached here at all — ``main.embed_query`` already keeps them in an
+in-process LRU, and a disk write per new question is not worth it.
+
+Vectors are stored as float16 bytes (768 B for a 384-d MiniLM vector) —
+the session indexes store float16 anyway (see utils/vector_index.py).
+
+The file is capped at ``max_rows`` vectors (roughly 0.85 KB each on disk).
+Past that, the oldest inserted rows are deleted; SQLite reuses their pages,
+so the file stops growing instead of accumulating every text ever seen.
+"""
+
+import hashlib
+import sqlite3
+import threading
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+__all__ = ["DiskCachedEmbeddings"]
+
+# Stay well below SQLite's limit on bound parameters per statement.
+_LOOKUP_BATCH = 500
+
+
+class DiskCachedEmbeddings(Embeddings):
+    """
+    ``Embeddings`` wrapper that caches vectors in SQLite.
+
+    Parameters
+    ----------
+    base:
+        The embedding model that computes cache misses.
+    path:
+        SQLite database file (created if missing).
+    model_name:
+        Included in every key so switching models never returns stale
+        vectors.
+    max_rows:
+        Most vectors kept; the oldest inserted are evicted beyond this.
+    timeout:
+        Seconds to wait for another process's lock before giving up.
+    """
+
+    def __init__(
+        self,
+        base: Embeddings,
+        path: str,
+        model_name: str,
+        max_rows: int = 200_000,
+        timeout: float = 1.0,
+    ):
+        self.base = base
+        self.max_rows = max_rows
+        self._prefix = model_name.encode() + b"\0"
+        self._conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (hash BLOB PRIMARY KEY, vec BLOB NOT NULL)"
+        )
+        self._conn.commit()
+        self._rows = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self._lock = threading.Lock()
+
+    def _key(self, text: str) -> bytes:
+        return hashlib.sha256(self._prefix + text.encode()).digest()
+
+    def _lookup(self, keys: list[bytes]) -> dict[bytes, list[float]]:
+        found: dict[bytes, list[float]] = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            try:
+                for start in range(0, len(unique), _LOOKUP_BATCH):
+                    batch = unique[start:start + _LOOKUP_BATCH]
+                    rows = self._conn.execute(
+                        "SELECT hash, vec FROM embeddings WHERE hash IN "
+                        f"({','.join('?' * len(batch))})",
+                        batch,
+                    ).fetchall()
+                    for key, blob in rows:
+                        found[key] = np.frombuffer(blob, dtype=np.float16).astype(np.float32).tolist()
+            except sqlite3.Error:
+                pass
+        return found
+
+    def _store(self, pairs: list[tuple[bytes, list[float]]]) -> None:
+        rows = [(key, np.asarray(vec, dtype=np.float16).tobytes()) for key, vec in pairs]
+        with self._lock:
+            try:
+                with self._conn:
+                    added = self._conn.executemany(
+                        "INSERT OR IGNORE INTO embeddings (hash, vec) VALUES (?, ?)", rows
+                    ).rowcount
+
+                    excess = self._rows + added - self.max_rows
+                    if excess > 0:
+                        # rowids grow with insertion order, so the smallest are oldest.
+                        self._conn.execute(
+                            "DELETE FROM embeddings WHERE rowid IN "
+                            "(SELECT rowid FROM embeddings ORDER BY rowid LIMIT ?)",
+                            (excess,),
+                        )
+            except sqlite3.Error:
+                return  # rolled back; the vectors just stay uncached
+            self._rows += added - max(excess, 0)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys = [self._key(t) for t in texts]
+        found = self._lookup(keys)
+
+        # Embed each missing text once, even if it repeats within *texts*.
+        missing = {k: t for k, t in zip(keys, texts) if k not in found}
+        if missing:
+            vectors = self.base.embed_documents(list(missing.values()))
+            new = list(zip(missing, vectors))
+            self._store(new)
+            found.update(new)
+
+        return [found[k] for k in keys]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.base.embed_query(text)
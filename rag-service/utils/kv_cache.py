@@ -0,0 +1,125 @@
+"""
+utils/kv_cache.py
+-----------------
+Prompt KV-cache reuse across turns for decoder-only generation models.
+
+WHY THIS EXISTS
+---------------
+Follow-up questions on the same documents produce prompts that share a long
+prefix (instruction + retrieved context).  Prefill attention over that prefix
+is most of the work for a short answer, and it was recomputed from scratch on
+every turn.
+
+This cache keeps the prompt's ``past_key_values`` from the previous turn for
+each key (endpoint name + the session ids being queried).  On the next turn
+only the tokens after the longest shared prefix need to be prefilled — for a
+repeated /summarize or /compare that is the whole prompt but one token.
+
+Entries are LRU-evicted against a byte budget.  The size of an entry is
+estimated from the model config as
+``2 × layers × kv_heads × head_dim × seq_len × dtype bytes``.
+
+Encoder-decoder models (flan-t5, the default) are not supported: their encoder
+is bidirectional, so no prefix of the input can be reused on its own.
+"""
+
+import copy
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+import torch
+
+__all__ = ["PrefixKVCache"]
+
+
+class PrefixKVCache:
+    """
+    LRU map of ``key -> (prompt token ids, past_key_values)``.
+
+    Parameters
+    ----------
+    model_config:
+        The generation model's ``PretrainedConfig`` (used to size entries).
+    dtype:
+        dtype of the model weights / KV tensors.
+    max_bytes:
+        Total KV memory the cache may hold.
+    min_reuse_tokens:
+        Shared prefixes shorter than this are not worth a cache copy.
+    """
+
+    def __init__(
+        self,
+        model_config,
+        dtype: torch.dtype,
+        max_bytes: int,
+        min_reuse_tokens: int = 16,
+    ):
+        n_layers = model_config.num_hidden_layers
+        n_heads = model_config.num_attention_heads
+        n_kv_heads = getattr(model_config, "num_key_value_heads", None) or n_heads
+        head_dim = getattr(model_config, "head_dim", None) or model_config.hidden_size // n_heads
+        dtype_bytes = torch.finfo(dtype).bits // 8
+
+        self.bytes_per_token = 2 * n_layers * n_kv_heads * head_dim * dtype_bytes
+        self.max_bytes = max_bytes
+        self.min_reuse_tokens = min_reuse_tokens
+
+        self._entries: "OrderedDict[Hashable, tuple[torch.Tensor, object, int]]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, key: Hashable, input_ids: torch.Tensor) -> Optional[object]:
+        """
+        Return a private copy of the cached KV for the longest prefix shared
+        between the previous prompt under *key* and *input_ids* (1-D), or
+        ``None`` if nothing useful is cached.
+
+        At least one token of *input_ids* is always left uncached, since
+        ``generate()`` needs a token to run the first forward pass on.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            cached_ids, past, _ = entry
+
+        n = min(len(cached_ids), len(input_ids) - 1)
+        if n < self.min_reuse_tokens:
+            return None
+
+        mismatch = (cached_ids[:n] != input_ids[:n]).nonzero()
+        shared = int(mismatch[0]) if len(mismatch) else n
+        if shared < self.min_reuse_tokens:
+            return None
+
+        # generate() appends to the cache in place — never hand out the stored one.
+        past = copy.deepcopy(past)
+        past.crop(shared)
+        return past
+
+    def store(self, key: Hashable, input_ids: torch.Tensor, past) -> None:
+        """Keep *past* (already cropped to ``len(input_ids)``) for *key*."""
+        size = len(input_ids) * self.bytes_per_token
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old[2]
+
+            self._entries[key] = (input_ids.detach(), past, size)
+            self._total_bytes += size
+
+            while self._total_bytes > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted
+
+    def discard_session(self, session_id: str) -> None:
+        """Drop every entry whose key includes *session_id*."""
+        with self._lock:
+            for key in [k for k in self._entries if session_id in k]:
+                self._total_bytes -= self._entries.pop(key)[2]
@@ -0,0 +1,124 @@
+"""
+utils/onnx_embeddings.py
+------------------------
+ONNX Runtime backend for the sentence-transformers embedding model.
+
+WHY THIS EXISTS
+---------------
+Embedding every chunk of an uploaded PDF dominates ingestion latency, and
+``HuggingFaceEmbeddings`` runs the MiniLM encoder in eager-mode PyTorch.
+Exporting the same model to ONNX and running it through ONNX Runtime (with
+full graph optimisation) gives the same vectors at 2–3x the throughput,
+and also cuts per-query embedding latency.
+
+Enabled from ``main.py`` with ``EMBEDDING_BACKEND=onnx``.  Requires the
+optional ``optimum[onnxruntime]`` (or ``optimum[onnxruntime-gpu]``) package.
+
+The model is exported on first use and saved to *export_dir*, so later
+restarts load the ONNX graph directly.
+
+Pooling matches sentence-transformers/all-MiniLM-L6-v2: attention-masked
+mean pooling followed by L2 normalisation.
+"""
+
+import os
+from typing import Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+__all__ = ["OnnxEmbeddings"]
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    LangChain ``Embeddings`` implementation backed by ONNX Runtime.
+
+    Parameters
+    ----------
+    model_name:
+        Hugging Face model id of the sentence-transformers model.
+    export_dir:
+        Directory holding (or receiving) the exported ONNX model.
+    batch_size:
+        Number of texts encoded per ``session.run`` call.
+    max_length:
+        Token limit per text (MiniLM was trained with 256).
+    provider:
+        ONNX Runtime execution provider.  Defaults to CUDA when available,
+        otherwise CPU.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        export_dir: Optional[str] = None,
+        batch_size: int = 256,
+        max_length: int = 256,
+        provider: Optional[str] = None,
+    ):
+        try:
+            import onnxruntime as ort
+            from optimum.onnxruntime import ORTModelForFeatureExtraction
+        except ImportError as e:
+            raise ImportError(
+                "EMBEDDING_BACKEND=onnx requires 'optimum[onnxruntime]' "
+                "(or 'optimum[onnxruntime-gpu]')"
+            ) from e
+        from transformers import AutoTokenizer
+
+        if provider is None:
+            provider = (
+                "CUDAExecutionProvider"
+                if "CUDAExecutionProvider" in ort.get_available_providers()
+                else "CPUExecutionProvider"
+            )
+
+        session_options = ort.SessionOptions()
+        session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        if export_dir and os.path.isdir(export_dir):
+            source, export = export_dir, False
+        else:
+            source, export = model_name, True
+
+        self.model = ORTModelForFeatureExtraction.from_pretrained(
+            source,
+            export=export,
+            provider=provider,
+            session_options=session_options,
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(source)
+
+        if export and export_dir:
+            self.model.save_pretrained(export_dir)
+            self.tokenizer.save_pretrained(export_dir)
+
+        self.batch_size = batch_size
+        self.max_length = max_length
+
+    def _embed(self, texts: list[str]) -> list[list[float]]:
+        vectors: list[list[float]] = []
+        for start in range(0, len(texts), self.batch_size):
+            encoded = self.tokenizer(
+                texts[start:start + self.batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="np",
+            )
+            hidden = self.model(**encoded).last_hidden_state
+
+            # Attention-masked mean pooling, then L2 normalisation.
+            mask = encoded["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+            vectors.extend(pooled.tolist())
+        return vectors
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._embed(list(texts))
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed([text])[0]
@@ -17,7 +17,9 @@ extract_comparison(llm_output)     → clean comparison string
 
 All three call the shared _clean() pipeline and only differ in the marker
 they look for ("Answer:" / "Summary:" / "Comparison:") and their fallback
-message.
+message.  Results are kept in one LRU cache of the last 4096 (output, kind)
+pairs, since cleaning is a pure function of the raw output; use
+``_clean.cache_clear()`` to reset it.
 
 CLEANING PIPELINE (applied in order by _clean)
 -----------------------------------------------
@@ -41,25 +43,54 @@ CLEANING PIPELINE (applied in order by _clean)
 """
 
 import re
+import threading
+from functools import lru_cache
 from typing import Optional
 
+try:
+    import hyperscan
+except ImportError:  # optional: see _has_echo
+    hyperscan = None
+
 __all__ = ["extract_final_answer", "extract_final_summary", "extract_comparison"]
 
 
 # ---------------------------------------------------------------------------
 # Marker definitions
-# Each entry: (compiled regex to FIND the marker, plain label for stripping)
+# A marker sits at the start of the text or right after a newline.  The two
+# cases are separate patterns: starting with the literal "\n" lets the regex
+# engine jump from newline to newline instead of trying every position
+# (an unanchored (?:^|\n) alternation is ~20x slower on long echoes).
 # ---------------------------------------------------------------------------
 
-_MARKER_ANSWER      = re.compile(r'(?:^|\n)\s*Answer\s*[:\-]?\s*\n?', re.IGNORECASE)
-_MARKER_SUMMARY     = re.compile(r'(?:^|\n)\s*Summary\s*[:\-]?\s*\n?', re.IGNORECASE)
-_MARKER_COMPARISON  = re.compile(r'(?:^|\n)\s*Comparison\s*[:\-]?\s*\n?', re.IGNORECASE)
+_MARKER_ANSWER      = re.compile(r'\n\s*Answer\s*[:\-]?\s*\n?', re.IGNORECASE)
+_MARKER_SUMMARY     = re.compile(r'\n\s*Summary\s*[:\-]?\s*\n?', re.IGNORECASE)
+_MARKER_COMPARISON  = re.compile(r'\n\s*Comparison\s*[:\-]?\s*\n?', re.IGNORECASE)
+
+_START_MARKER_ANSWER      = re.compile(r'\s*Answer\s*[:\-]?\s*\n?', re.IGNORECASE)
+_START_MARKER_SUMMARY     = re.compile(r'\s*Summary\s*[:\-]?\s*\n?', re.IGNORECASE)
+_START_MARKER_COMPARISON  = re.compile(r'\s*Comparison\s*[:\-]?\s*\n?', re.IGNORECASE)
 
 # Strip a stray leading marker that the model echoed inside its own answer
 _LEADING_ANSWER_RE      = re.compile(r'(?i)^Answer\s*[:\-]\s*')
 _LEADING_SUMMARY_RE     = re.compile(r'(?i)^Summary\s*[:\-]\s*')
 _LEADING_COMPARISON_RE  = re.compile(r'(?i)^Comparison\s*[:\-]\s*')
 
+# Returned when nothing useful survives cleaning
+_FALLBACK_ANSWER      = "I could not find a relevant answer in the document."
+_FALLBACK_SUMMARY     = "I could not generate a summary for this document."
+_FALLBACK_COMPARISON  = "I could not generate a comparison for these documents."
+
+# Everything _clean needs per output kind, indexed by _ANSWER / _SUMMARY /
+# _COMPARISON: (start marker, marker, leading marker, fallback).
+_ANSWER, _SUMMARY, _COMPARISON = range(3)
+
+_KIND_CONFIG: tuple[tuple[re.Pattern, re.Pattern, re.Pattern, str], ...] = (
+    (_START_MARKER_ANSWER, _MARKER_ANSWER, _LEADING_ANSWER_RE, _FALLBACK_ANSWER),
+    (_START_MARKER_SUMMARY, _MARKER_SUMMARY, _LEADING_SUMMARY_RE, _FALLBACK_SUMMARY),
+    (_START_MARKER_COMPARISON, _MARKER_COMPARISON, _LEADING_COMPARISON_RE, _FALLBACK_COMPARISON),
+)
+
 
 # ---------------------------------------------------------------------------
 # Echo patterns — lines that are clearly from the prompt / system, not the
@@ -68,33 +99,38 @@ _LEADING_COMPARISON_RE  = re.compile(r'(?i)^Comparison\s*[:\-]\s*')
 # ---------------------------------------------------------------------------
 
 _ECHO_PATTERNS: list[str] = [
+    # ── Lines the current prompt templates emit ──────────────────────────────
+    # These are what the model actually echoes, so they come first: the
+    # alternation is tried left to right and the common case exits early.
+    r'^\s*Document\s*[:\-]',
+    r'^\s*Question\s*[:\-]',
+    r'^\s*Answer the question using',
+    r'^\s*History\s*[:\-]',
+    r'^\s*Doc\d+\s*[:\-]',              # Doc1: / Doc2: comparison headers
+    r'^\s*Summarize the document',
+    r'^\s*Compare the documents',
+    r'^\s*Be brief',
+
     # ── Section headers ──────────────────────────────────────────────────────
     r'^\s*Context\s*[:\-]',
-    r'^\s*Question\s*[:\-]',
-    r'^\s*Document\s*[:\-]',
     r'^\s*Document\s+(?:Context|excerpt|below)\s*[:\-]?',
     r'^\s*Instructions?\s*[:\-]',
     r'^\s*Conversation\s+History\s*[:\-]',
     r'^\s*Current\s+Question\s*[:\-]',
     r'^\s*Previous\s+conversation\s*[:\-]?',
-    r'^\s*History\s*[:\-]',
-    r'^\s*Doc\d+\s*[:\-]',              # Doc1: / Doc2: comparison headers
     r'^\s*RULES\s*[:\-]',
 
     # ── Instruction sentences ─────────────────────────────────────────────────
     r'^\s*You are a (?:helpful|precise|document)',
-    r'^\s*Answer the question using',
     r'^\s*Use the document',
     r'^\s*Use only the (?:provided|document)',
     r'^\s*Read the document',
     r'^\s*If the answer is not',
     r'^\s*If (?:you )?cannot find',
     r'^\s*Keep the answer',
-    r'^\s*Be brief',
     r'^\s*Be concise',
     r'^\s*Base your',
-    r'^\s*Do NOT',
-    r'^\s*Do not',
+    r'^\s*(?:[-•*]\s*)?Do not',        # also "- Do NOT" bullets (IGNORECASE)
     r'^\s*Your response must',
     r'^\s*Your answer (?:must|should)',
     r'^\s*Never (?:include|repeat|add)',
@@ -103,8 +139,6 @@ _ECHO_PATTERNS: list[str] = [
     r'^\s*Return (?:only|a|the)',
     r'^\s*Provide (?:a (?:short|brief|concise))',
     r'^\s*Give a (?:short|brief|one-line)',
-    r'^\s*Compare the documents',
-    r'^\s*Summarize the document',
     r'^\s*In \d+[\-–]?\d* (?:bullet|key)',
 
     # ── Bullet-point instruction lines ────────────────────────────────────────
@@ -112,7 +146,6 @@ _ECHO_PATTERNS: list[str] = [
     r'^\s*[-•*]\s*Summarize in',
     r'^\s*[-•*]\s*Clearly distinguish',
     r'^\s*[-•*]\s*Return clean',
-    r'^\s*[-•*]\s*Do NOT',
     r'^\s*[-•*]\s*list key',
     r'^\s*[-•*]\s*Give a',
 
@@ -123,7 +156,13 @@ _ECHO_PATTERNS: list[str] = [
     r'^\s*document comparison assistant',
 ]
 
-_ECHO_RE = re.compile("|".join(_ECHO_PATTERNS), re.IGNORECASE)
+# One MULTILINE pass over the whole text instead of a match per line.
+# ``\s`` becomes ``[^\S\n]`` so no pattern can reach into the next line, and
+# each match consumes the rest of its line plus the newline.
+_ECHO_LINE_RE = re.compile(
+    r'^(?:' + "|".join(p.replace(r'\s', r'[^\S\n]') for p in _ECHO_PATTERNS) + r').*\n?',
+    re.IGNORECASE | re.MULTILINE,
+)
 
 
 # ---------------------------------------------------------------------------
@@ -146,30 +185,145 @@ _SENTENCE_ECHO_RE = re.compile(
     re.IGNORECASE,
 )
 
+# Rough sentence boundaries: whitespace after  .  ?  !
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.?!])\s+')
+
+
+# ---------------------------------------------------------------------------
+# Character-spacing pattern — runs of 3+ single letters separated by single
+# spaces ("N P T E L").  Rather than matching the whole run and rebuilding it
+# in a Python callback, match each space INSIDE such a run and delete it:
+# the space must sit between two isolated letters, and one more isolated
+# letter must follow on the right or precede on the left (so the run has at
+# least 3).  The pattern starts with a literal space, letting the engine skip
+# straight to candidate positions, and sub("") never calls back into Python.
+# ---------------------------------------------------------------------------
+
+_SPACED_LETTERS_RE = re.compile(
+    r' (?<=\b[A-Za-z] )'
+    r'(?:(?<=\b[A-Za-z] [A-Za-z] )(?=[A-Za-z]\b)|(?=[A-Za-z] [A-Za-z]\b))'
+)
+
+# Every line boundary str.splitlines() recognises besides "\n".  They are
+# turned into "\n" before step 3, whose MULTILINE regex only breaks lines on
+# "\n", so it sees the same lines a splitlines() pass would.
+_LINE_BREAK_RE = re.compile(r'\r\n?|[\x0b\x0c\x1c-\x1e\x85\u2028\u2029]')
+
+# Whitespace normalisation (step 5).
+_MULTI_SPACE_RE = re.compile(r'[ \t]{2,}')
+_MULTI_BLANK_LINE_RE = re.compile(r'\n{3,}')
+
+
+# ---------------------------------------------------------------------------
+# Filter guards — whitespace that steps 4–5 would change.  Together with
+# _has_echo they tell _clean whether steps 3–5 can change the text at all.
+# The sentence filter rejoins sentences with a single space, so any other
+# whitespace after . ? ! counts as "would change" too.
+# ---------------------------------------------------------------------------
+
+_NEEDS_NORMALISING: tuple[re.Pattern, ...] = (
+    re.compile(r'[.?!](?:\s\s|[^\S ])'),
+    _MULTI_SPACE_RE,
+    _MULTI_BLANK_LINE_RE,
+)
+
+
+# ---------------------------------------------------------------------------
+# Optional Hyperscan echo scanner.  With the ``hyperscan`` package installed,
+# every echo-line and inline-instruction pattern is compiled into one
+# database, and "does any echo pattern match?" becomes a single linear scan
+# instead of two backtracking ``re`` searches (the sentence-echo search is
+# the slowest check on clean output).  Only the yes/no answer comes from
+# Hyperscan; the filters themselves keep using ``re``.
+# ---------------------------------------------------------------------------
+
+def _build_echo_scanner():
+    # Hyperscan's \s (even with UCP) misses characters Python's \s matches,
+    # e.g. \x1c-\x1f and \x85, so spell out Python's set, minus the newline.
+    space = (
+        r'[\x{9}\x{b}-\x{d}\x{1c}-\x{20}\x{85}\x{a0}\x{1680}\x{2000}-\x{200a}'
+        r'\x{2028}\x{2029}\x{202f}\x{205f}\x{3000}]'
+    )
+    base = (
+        hyperscan.HS_FLAG_CASELESS
+        | hyperscan.HS_FLAG_SINGLEMATCH
+        | hyperscan.HS_FLAG_UTF8
+        | hyperscan.HS_FLAG_UCP
+    )
+    expressions = [p.replace(r'\s', space).encode() for p in _ECHO_PATTERNS]
+    flags = [base | hyperscan.HS_FLAG_MULTILINE] * len(expressions)
+    expressions += [p.encode() for p in _SENTENCE_ECHO_PATTERNS]
+    flags += [base] * len(_SENTENCE_ECHO_PATTERNS)
+
+    db = hyperscan.Database()
+    db.compile(
+        expressions=expressions,
+        ids=list(range(len(expressions))),
+        elements=len(expressions),
+        flags=flags,
+    )
+    return db
+
+
+_ECHO_SCANNER = _build_echo_scanner() if hyperscan is not None else None
+
+# Hyperscan scratch space cannot be shared by concurrent scans.
+_scan_local = threading.local()
+
+
+def _stop_scan(*_args) -> bool:
+    return True  # first match is enough
+
+
+def _has_echo(text: str) -> bool:
+    """True if any echo-line or inline-instruction pattern matches *text*."""
+    if _ECHO_SCANNER is not None:
+        try:
+            data = text.encode()
+        except UnicodeEncodeError:  # lone surrogates: not valid UTF-8
+            pass
+        else:
+            scratch = getattr(_scan_local, "scratch", None)
+            if scratch is None:
+                scratch = _scan_local.scratch = hyperscan.Scratch(_ECHO_SCANNER)
+            try:
+                _ECHO_SCANNER.scan(data, match_event_handler=_stop_scan, scratch=scratch)
+            except hyperscan.ScanTerminated:
+                return True
+            return False
+
+    return bool(_ECHO_LINE_RE.search(text) or _SENTENCE_ECHO_RE.search(text))
+
 
 # ---------------------------------------------------------------------------
 # Internal pipeline
 # ---------------------------------------------------------------------------
 
-def _split_on_marker(text: str, marker_re: re.Pattern) -> str:
+def _split_on_marker(
+    text: str, start_marker_re: re.Pattern, marker_re: re.Pattern
+) -> str:
     """
-    Return only the text AFTER the last occurrence of *marker_re*.
+    Return only the text AFTER the last marker — *start_marker_re* at the
+    very start, or *marker_re* after a newline.
     If the marker is not found, return *text* unchanged.
     """
-    # finditer gives us all matches; we want the LAST one so the model's
-    # own "Answer: ..." production inside a long echo is used.
-    matches = list(marker_re.finditer(text))
-    if not matches:
+    # We want the LAST marker so the model's own "Answer: ..." production
+    # inside a long echo is used; keep a running end offset rather than a
+    # list of every match.
+    end = -1
+    first = start_marker_re.match(text)
+    if first:
+        end = first.end()
+    for match in marker_re.finditer(text, max(end, 0)):
+        end = match.end()
+    if end < 0:
         return text
-    last = matches[-1]
-    return text[last.end():].strip()
+    return text[end:].strip()
 
 
 def _filter_echo_lines(text: str) -> str:
     """Remove lines that match known instruction / context-header patterns."""
-    lines = text.splitlines()
-    kept = [ln for ln in lines if not _ECHO_RE.match(ln)]
-    return "\n".join(kept)
+    return _ECHO_LINE_RE.sub("", text)
 
 
 def _filter_echo_sentences(text: str) -> str:
@@ -177,48 +331,55 @@ def _filter_echo_sentences(text: str) -> str:
     Remove sentences that ARE instruction text inlined by the model.
     Splits on sentence-ending punctuation to identify and drop them.
     """
+    # No instruction sentence anywhere (the usual case): only the rejoin with
+    # single spaces is left, done in place without building the sentence
+    # list.  The patterns contain no . ? ! so a match can never straddle a
+    # sentence boundary — a miss on the whole text is a miss on every part.
+    if not _SENTENCE_ECHO_RE.search(text):
+        return _SENTENCE_SPLIT_RE.sub(" ", text)
+
     # Split into rough sentences on  .  ?  !  (followed by space or end)
-    parts = re.split(r'(?<=[.?!])\s+', text)
+    parts = _SENTENCE_SPLIT_RE.split(text)
     kept = [s for s in parts if not _SENTENCE_ECHO_RE.search(s)]
     return " ".join(kept)
 
 
+def _needs_filtering(text: str) -> bool:
+    """True if steps 3–5 (echo filters, whitespace normalisation) could change *text*."""
+    return any(p.search(text) for p in _NEEDS_NORMALISING) or _has_echo(text)
+
+
 def _normalize_spaced_text(text: str) -> str:
     """
     Fix character-level spaced tokens produced by certain PDF parsers.
     E.g. ``"N P T E L"`` → ``"NPTEL"``.
     """
-    def _join(m: re.Match) -> str:
-        return m.group(0).replace(" ", "")
+    return _SPACED_LETTERS_RE.sub("", text)
 
-    return re.sub(r'\b(?:[A-Za-z] ){2,}[A-Za-z]\b', _join, text)
 
+def _as_text(llm_output) -> str:
+    """Coerce a non-``str`` model output (e.g. ``None``) to text for ``_clean``."""
+    return str(llm_output) if llm_output is not None else ""
 
-def _clean(
-    llm_output: str,
-    marker_re: re.Pattern,
-    leading_marker_re: re.Pattern,
-    fallback: str,
-) -> str:
+
+@lru_cache(maxsize=4096)
+def _clean(llm_output: str, kind: int) -> str:
     """
     Shared cleaning pipeline used by all three public functions.
 
     Parameters
     ----------
     llm_output:
-        Raw string from the generation model.
-    marker_re:
-        Compiled regex that matches the terminal prompt marker
-        (``Answer:``, ``Summary:``, or ``Comparison:``).
-    leading_marker_re:
-        Compiled regex that strips a stray marker the model emitted at the
-        very start of its output (e.g. ``"Answer: Answer: <text>"``).
-    fallback:
-        Message returned when nothing useful survives cleaning.
+        Raw string from the generation model.  Must already be a ``str``
+        (it is also the cache key); the public functions coerce anything
+        else, hashable or not, with ``_as_text``.
+    kind:
+        ``_ANSWER``, ``_SUMMARY`` or ``_COMPARISON`` — selects the terminal
+        prompt marker (``Answer:``, ``Summary:``, or ``Comparison:``), the
+        stray leading marker to strip (e.g. ``"Answer: Answer: <text>"``)
+        and the message returned when nothing useful survives cleaning.
     """
-    # Guard: handle None / non-string inputs.
-    if not isinstance(llm_output, str):
-        llm_output = str(llm_output) if llm_output is not None else ""
+    start_marker_re, marker_re, leading_marker_re, fallback = _KIND_CONFIG[kind]
 
     raw = llm_output.strip()
 
@@ -226,18 +387,25 @@ def _clean(
     # Using _split_on_marker (last occurrence) handles the common pattern where
     # flan-t5 echoes the entire prompt and then produces "Answer: <text>" at
     # the end of the echo.
-    raw = _split_on_marker(raw, marker_re)
+    raw = _split_on_marker(raw, start_marker_re, marker_re)
 
-    # ── Step 3: Line-level echo filter ───────────────────────────────────────
-    raw = _filter_echo_lines(raw)
+    # "\r\n", "\r", "\u2028", ... → "\n", so every later step sees one kind
+    # of line break.
+    raw = _LINE_BREAK_RE.sub("\n", raw)
 
-    # ── Step 4: Sentence-level instruction filter ─────────────────────────────
-    raw = _filter_echo_sentences(raw)
+    # Fast path: most outputs — or the short "<text>" tail after the marker —
+    # are already clean, so skip steps 3–5 when none of them could change it.
+    if _needs_filtering(raw):
+        # ── Step 3: Line-level echo filter ───────────────────────────────────
+        raw = _filter_echo_lines(raw)
 
-    # ── Step 5: Whitespace normalisation ─────────────────────────────────────
-    raw = re.sub(r'[ \t]{2,}', ' ', raw)    # multiple spaces/tabs → one space
-    raw = re.sub(r'\n{3,}', '\n\n', raw)    # triple+ blank lines → double
-    raw = raw.strip()
+        # ── Step 4: Sentence-level instruction filter ─────────────────────────
+        raw = _filter_echo_sentences(raw)
+
+        # ── Step 5: Whitespace normalisation ─────────────────────────────────
+        raw = _MULTI_SPACE_RE.sub(' ', raw)          # multiple spaces/tabs → one space
+        raw = _MULTI_BLANK_LINE_RE.sub('\n\n', raw)  # triple+ blank lines → double
+        raw = raw.strip()
 
     # ── Step 6: Character-spacing normalisation ───────────────────────────────
     raw = _normalize_spaced_text(raw)
@@ -270,12 +438,9 @@ def extract_final_answer(llm_output: str) -> str:
     str
         Clean, user-facing answer text.  Never an empty string.
     """
-    return _clean(
-        llm_output,
-        marker_re=_MARKER_ANSWER,
-        leading_marker_re=_LEADING_ANSWER_RE,
-        fallback="I could not find a relevant answer in the document.",
-    )
+    if type(llm_output) is not str:
+        llm_output = _as_text(llm_output)
+    return _clean(llm_output, _ANSWER)
 
 
 def extract_final_summary(llm_output: str) -> str:
@@ -295,12 +460,9 @@ def extract_final_summary(llm_output: str) -> str:
     str
         Clean, user-facing summary text.  Never an empty string.
     """
-    return _clean(
-        llm_output,
-        marker_re=_MARKER_SUMMARY,
-        leading_marker_re=_LEADING_SUMMARY_RE,
-        fallback="I could not generate a summary for this document.",
-    )
+    if type(llm_output) is not str:
+        llm_output = _as_text(llm_output)
+    return _clean(llm_output, _SUMMARY)
 
 
 def extract_comparison(llm_output: str) -> str:
@@ -320,9 +482,6 @@ def extract_comparison(llm_output: str) -> str:
     str
         Clean, user-facing comparison text.  Never an empty string.
     """
-    return _clean(
-        llm_output,
-        marker_re=_MARKER_COMPARISON,
-        leading_marker_re=_LEADING_COMPARISON_RE,
-        fallback="I could not generate a comparison for these documents.",
-    )
+    if type(llm_output) is not str:
+        llm_output = _as_text(llm_output)
+    return _clean(llm_output, _COMPARISON)
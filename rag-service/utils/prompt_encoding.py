@@ -0,0 +1,119 @@
+"""
+utils/prompt_encoding.py
+------------------------
+Tokenization of generation prompts, reusing the ids of their fixed parts.
+
+WHY THIS EXISTS
+---------------
+Every prompt starts with one of a few fixed instruction sentences, and the
+retrieved document context (everything before the last blank line) repeats
+across follow-up questions and re-clicked summaries.  Tokenizing the whole
+prompt on every request redoes that work each time.
+
+``PromptEncoder`` tokenizes each instruction once, tokenizes the context
+through an LRU cache, and only tokenizes the short tail ("Question: ..." /
+"Summary:") per request.  Special tokens are spliced in from the ids a plain
+tokenizer call puts around a sample text (transformers 5 tokenizers no longer
+have ``build_inputs_with_special_tokens`` / ``prepare_for_model``).
+
+Tokenizing pieces separately only gives the whole-prompt ids when the
+tokenizer treats every split point as a word boundary — true for T5 and
+GPT-2 style BPE, not for SentencePiece-style tokenizers that prepend "▁" to
+each separately tokenized piece (Llama, Mistral).  The encoder therefore
+compares both on sample prompts when it is built, first with and then
+without the context split, and uses the plain whole-prompt tokenizer call
+whenever the pieced-together ids would differ.
+"""
+
+from functools import lru_cache
+from typing import Iterable, Optional
+
+__all__ = ["PromptEncoder"]
+
+
+class PromptEncoder:
+    """
+    Turn prompts into input ids, identical to
+    ``tokenizer(prompt, truncation=True, max_length=max_length)``.
+
+    Parameters
+    ----------
+    tokenizer:
+        The generation model's tokenizer.
+    prefixes:
+        Fixed instruction sentences prompts may start with.
+    max_length:
+        Longest encoding returned (special tokens included).
+    sample_prompts:
+        Prompts in the shape the endpoints build, used to check that the
+        pieced-together ids match a whole-prompt tokenizer call.
+    cache_size:
+        Number of context segments kept tokenized.
+    """
+
+    def __init__(
+        self,
+        tokenizer,
+        prefixes: Iterable[str],
+        max_length: int,
+        sample_prompts: Iterable[str],
+        cache_size: int = 256,
+    ):
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+        self._prefix_ids = {prefix: self._ids(prefix) for prefix in prefixes}
+        self._segment_ids = lru_cache(maxsize=cache_size)(self._segment)
+        self._special = self._special_tokens()
+
+        samples = list(sample_prompts)
+        self.segmented = self.fast = self._special is not None
+        if self.fast and not self._matches_plain(samples):
+            self.segmented = False
+            self.fast = self._matches_plain(samples)
+        self._segment_ids.cache_clear()
+
+    def encode(self, prompt: str) -> list[int]:
+        """Input ids for *prompt*, special tokens included."""
+        if self.fast:
+            for prefix, prefix_ids in self._prefix_ids.items():
+                if prompt.startswith(prefix):
+                    return self._encode_pieces(prefix_ids, prompt[len(prefix):])
+        return self._plain(prompt)
+
+    def _ids(self, text: str) -> list[int]:
+        return self.tokenizer(text, add_special_tokens=False)["input_ids"]
+
+    def _segment(self, text: str) -> tuple[int, ...]:
+        return tuple(self._ids(text))
+
+    def _plain(self, prompt: str) -> list[int]:
+        return self.tokenizer(prompt, truncation=True, max_length=self.max_length)["input_ids"]
+
+    def _special_tokens(self) -> Optional[tuple[list[int], list[int]]]:
+        """Ids a plain call adds before and after the text, if they can be located."""
+        bare = self._ids("a")
+        full = self.tokenizer("a")["input_ids"]
+        for start in range(len(full) - len(bare) + 1):
+            if full[start:start + len(bare)] == bare:
+                return full[:start], full[start + len(bare):]
+        return None
+
+    def _body_ids(self, body: str) -> list[int]:
+        if self.segmented and "\n\n" in body:
+            head, sep, tail = body.rpartition("\n\n")
+            return [*self._segment_ids(head), *self._ids(sep + tail)]
+        return self._ids(body)
+
+    def _encode_pieces(self, prefix_ids: list[int], body: str) -> list[int]:
+        head, tail = self._special
+        content = (prefix_ids + self._body_ids(body))[:self.max_length - len(head) - len(tail)]
+        return head + content + tail
+
+    def _matches_plain(self, samples: list[str]) -> bool:
+        for prompt in samples:
+            for prefix, prefix_ids in self._prefix_ids.items():
+                if prompt.startswith(prefix):
+                    if self._encode_pieces(prefix_ids, prompt[len(prefix):]) != self._plain(prompt):
+                        return False
+                    break
+        return True
@@ -18,7 +18,12 @@ All builders follow the same contract:
     are the primary source of echoed instruction text.
 """
 
-__all__ = ["build_ask_prompt", "build_summarize_prompt", "build_compare_prompt"]
+__all__ = [
+    "build_ask_prompt",
+    "build_summarize_prompt",
+    "build_compare_prompt",
+    "PROMPT_INSTRUCTIONS",
+]
 
 
 # ---------------------------------------------------------------------------
@@ -29,11 +34,35 @@ _MAX_CONTEXT_CHARS = 1_400   # leave room for question + instructions
 _MAX_CONV_CHARS    = 400     # history budget
 
 
+# ---------------------------------------------------------------------------
+# Instruction sentences — the fixed first line of every prompt.
+# Exported as PROMPT_INSTRUCTIONS so the generation code can tokenize these
+# prefixes once at startup instead of on every request.
+# ---------------------------------------------------------------------------
+_ASK_INSTRUCTION = "Answer the question using only the document below. Be brief and direct."
+
+_SUMMARIZE_INSTRUCTION = (
+    "Summarize the document below in 3 to 5 key bullet points. Use only the provided text."
+)
+
+_COMPARE_INSTRUCTION = (
+    "Compare the documents below. Give a one-line overview of each, "
+    "then list key similarities and key differences. Use only the provided text."
+)
+
+PROMPT_INSTRUCTIONS = (_ASK_INSTRUCTION, _SUMMARIZE_INSTRUCTION, _COMPARE_INSTRUCTION)
+
+
 def _truncate(text: str, max_chars: int) -> str:
     """Hard-truncate *text* to *max_chars* characters, adding an ellipsis."""
     if len(text) <= max_chars:
         return text
-    return text[: max_chars - 3].rstrip() + "..."
+    # Back up over trailing whitespace in place of slice-then-rstrip, so only
+    # one copy of the kept text is made.
+    end = max(max_chars - 3, 0)
+    while end and text[end - 1].isspace():
+        end -= 1
+    return text[:end] + "..."
 
 
 # ---------------------------------------------------------------------------
@@ -59,24 +88,14 @@ def build_ask_prompt(context: str, question: str, conversation_context: str = ""
         A compact prompt string ready to pass to the generation model.
     """
     ctx = _truncate(context, _MAX_CONTEXT_CHARS)
-    conv = _truncate(conversation_context.strip(), _MAX_CONV_CHARS) if conversation_context.strip() else ""
-
-    # Minimal instruction sentence — one line only, no bullet points.
-    instruction = "Answer the question using only the document below. Be brief and direct."
-
-    parts = [instruction, ""]
-
+    conv = conversation_context.strip()
     if conv:
-        parts += [f"History: {conv}", ""]
+        conv = _truncate(conv, _MAX_CONV_CHARS)
 
-    parts += [
-        f"Document: {ctx}",
-        "",
-        f"Question: {question}",
-        "Answer:",
-    ]
+    history = f"History: {conv}\n\n" if conv else ""
 
-    return "\n".join(parts)
+    # Minimal instruction sentence — one line only, no bullet points.
+    return f"{_ASK_INSTRUCTION}\n\n{history}Document: {ctx}\n\nQuestion: {question}\nAnswer:"
 
 
 def build_summarize_prompt(context: str) -> str:
@@ -95,15 +114,7 @@ def build_summarize_prompt(context: str) -> str:
     """
     ctx = _truncate(context, _MAX_CONTEXT_CHARS)
 
-    instruction = "Summarize the document below in 3 to 5 key bullet points. Use only the provided text."
-
-    return "\n".join([
-        instruction,
-        "",
-        f"Document: {ctx}",
-        "",
-        "Summary:",
-    ])
+    return f"{_SUMMARIZE_INSTRUCTION}\n\nDocument: {ctx}\n\nSummary:"
 
 
 def build_compare_prompt(per_doc_contexts: list[str]) -> str:
@@ -122,19 +133,9 @@ def build_compare_prompt(per_doc_contexts: list[str]) -> str:
     """
     # Each document gets an equal share of the context budget
     budget_each = _MAX_CONTEXT_CHARS // max(len(per_doc_contexts), 1)
-    doc_blocks = []
-    for i, ctx in enumerate(per_doc_contexts, start=1):
-        doc_blocks.append(f"Doc{i}: {_truncate(ctx, budget_each)}")
-
-    instruction = (
-        "Compare the documents below. Give a one-line overview of each, "
-        "then list key similarities and key differences. Use only the provided text."
-    )
-
-    return "\n".join([
-        instruction,
-        "",
-        "\n\n".join(doc_blocks),
-        "",
-        "Comparison:",
+    doc_blocks = "\n\n".join([
+        f"Doc{i}: {_truncate(ctx, budget_each)}"
+        for i, ctx in enumerate(per_doc_contexts, start=1)
     ])
+
+    return f"{_COMPARE_INSTRUCTION}\n\n{doc_blocks}\n\nComparison:"
@@ -0,0 +1,96 @@
+"""
+utils/query_cache.py
+--------------------
+Semantic cache of retrieval results for one vectorstore.
+
+WHY THIS EXISTS
+---------------
+/summarize and /compare retrieve with fixed query strings, and users often
+re-ask the same question.  The query embedding is already cached in
+``main.embed_query``; this cache also skips the FAISS search itself.
+
+Each cache keeps up to ``max_entries`` query vectors in one preallocated
+float32 matrix.  A lookup is a single matrix-vector product against every
+cached query; the best match is a hit when its cosine similarity reaches
+``threshold``.  Query vectors are expected to be L2-normalised, so the dot
+product is the cosine.
+
+The default threshold only accepts repeats of the same query (which score
+1.0 up to float rounding).  Lowering it lets paraphrases share results, but
+sentence embeddings barely separate questions that differ in one number or
+name — "revenue in 2020" and "revenue in 2021" score well above 0.95 — so a
+loose threshold returns another question's chunks.  Only lower it for
+callers whose queries cannot differ in such details.
+
+Session indexes never change after upload, so cached results cannot go
+stale; ``ttl`` still lets unused entries lapse.  Entries are overwritten
+oldest-first when the cache is full.
+"""
+
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+__all__ = ["SemanticQueryCache"]
+
+
+class SemanticQueryCache:
+    """
+    Fixed-size map of ``query vector -> retrieved documents``.
+
+    Parameters
+    ----------
+    max_entries:
+        Number of queries remembered; the oldest is overwritten when full.
+    threshold:
+        Minimum cosine similarity for a cached query to count as a hit.
+    ttl:
+        Optional seconds after which an entry no longer counts as a hit.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 64,
+        threshold: float = 0.999,
+        ttl: Optional[float] = None,
+    ):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl = ttl
+        self._matrix: Optional[np.ndarray] = None
+        self._results: list = [None] * max_entries
+        self._stored_at = np.zeros(max_entries, dtype=np.float64)
+        self._size = 0
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def get(self, query_vector, now: Optional[float] = None) -> Optional[list]:
+        """Cached results for the closest live query above the threshold, else ``None``."""
+        q = np.asarray(query_vector, dtype=np.float32)
+        if now is None:
+            now = time.monotonic()
+        with self._lock:
+            if not self._size:
+                return None
+            sims = self._matrix[:self._size] @ q
+            if self.ttl is not None:
+                sims[self._stored_at[:self._size] + self.ttl <= now] = -np.inf
+            best = int(sims.argmax())
+            if sims[best] < self.threshold:
+                return None
+            return self._results[best]
+
+    def put(self, query_vector, results: list, now: Optional[float] = None) -> None:
+        q = np.asarray(query_vector, dtype=np.float32)
+        if now is None:
+            now = time.monotonic()
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.zeros((self.max_entries, q.shape[0]), dtype=np.float32)
+            self._matrix[self._next] = q
+            self._results[self._next] = results
+            self._stored_at[self._next] = now
+            self._next = (self._next + 1) % self.max_entries
+            self._size = min(self._size + 1, self.max_entries)
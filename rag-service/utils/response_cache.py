@@ -0,0 +1,65 @@
+"""
+utils/response_cache.py
+-----------------------
+Optional Redis cache for final /ask, /summarize and /compare responses.
+
+WHY THIS EXISTS
+---------------
+Generation is the slowest step of every request (hundreds of ms to seconds),
+yet identical requests are common: the same question re-asked on the same
+documents, or Summarize / Compare clicked again.  A session's documents never
+change after upload, so the response for the same session ids and the same
+question can be returned straight from Redis.
+
+Enabled from ``main.py`` when ``REDIS_URL`` is set; requires the optional
+``redis`` package.  Redis is strictly best-effort — if it is down or slow,
+``get`` misses and ``set`` is skipped, and the request is served normally.
+"""
+
+import hashlib
+from typing import Optional
+
+import orjson
+
+__all__ = ["ResponseCache"]
+
+
+class ResponseCache:
+    """
+    Best-effort JSON response cache in Redis.
+
+    Parameters
+    ----------
+    url:
+        Redis connection URL, e.g. ``redis://localhost:6379/0``.
+    ttl:
+        Seconds before a cached response expires.
+    """
+
+    def __init__(self, url: str, ttl: int):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("REDIS_URL requires the 'redis' package") from e
+
+        self._error = redis.RedisError
+        self._client = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+        self.ttl = ttl
+
+    @staticmethod
+    def key(kind: str, *parts: str) -> str:
+        """Build a cache key such as ``ans:<sha1 of parts>``."""
+        return f"{kind}:" + hashlib.sha1("\0".join(parts).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        try:
+            value = self._client.get(key)
+        except self._error:
+            return None
+        return orjson.loads(value) if value is not None else None
+
+    def set(self, key: str, response: dict) -> None:
+        try:
+            self._client.setex(key, self.ttl, orjson.dumps(response))
+        except self._error:
+            pass
@@ -0,0 +1,271 @@
+"""
+utils/session_store.py
+----------------------
+Sharded, thread-safe in-memory session store for the PDF Q&A RAG service.
+
+WHY THIS EXISTS
+---------------
+Sessions used to live in a plain dict that every /ask, /summarize and
+/compare request scanned end-to-end to drop expired entries — O(N) work on
+the hot path, and one shared structure for every concurrent request.
+
+This store splits sessions across independently locked shards and keeps a
+min-heap of expiry deadlines, so a cleanup pass only touches sessions that
+are actually due (O(k log N) for k expired) and can run from a background
+task instead of inside request handlers.
+
+``touch`` only refreshes ``last_accessed``; when a stale heap entry is
+popped for a session that was used in the meantime, it is simply
+re-scheduled at its new deadline.  A session id that is removed and added
+again keeps its old heap entry as well, so an id can appear more than once;
+the extra entry is dropped or re-scheduled like any other stale one and
+never expires the session early.
+
+The same heap gives LRU eviction for free: the first popped entry whose
+deadline is still accurate belongs to the least recently used session.
+With ``max_sessions`` set, adding a session beyond the limit evicts it, so
+memory held by FAISS indexes stays bounded even before sessions time out.
+
+Each session is a slotted ``SessionState`` rather than a dict: no per-entry
+hash table, and attribute reads on the request path skip key hashing.
+"""
+
+import heapq
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, Optional
+
+__all__ = ["SessionState", "SessionStore"]
+
+
+@dataclass(slots=True)
+class SessionState:
+    """
+    One uploaded PDF's session.
+
+    ``last_accessed`` is in seconds since the epoch (``time.time()``);
+    ``pdf`` keeps a shared, de-duplicated index entry alive.
+    """
+
+    vectorstores: list
+    filename: str
+    last_accessed: float
+    pdf: Any = None
+
+
+class SessionStore:
+    """
+    Dict-like mapping of ``session_id -> SessionState`` with TTL expiry.
+
+    Parameters
+    ----------
+    timeout:
+        Seconds of inactivity after which a session expires.
+    num_shards:
+        Number of independently locked shards; must be a power of two.
+    on_expire:
+        Optional callback invoked with the session id of every session that
+        leaves the store — expired, evicted, or removed with ``pop``, ``del``
+        or ``clear`` — so per-session caches elsewhere can be released too.
+    max_sessions:
+        Optional cap on live sessions; the least recently used session is
+        evicted when a new one would exceed it.
+    """
+
+    def __init__(
+        self,
+        timeout: float,
+        num_shards: int = 16,
+        on_expire: Optional[Callable[[str], None]] = None,
+        max_sessions: Optional[int] = None,
+    ):
+        if num_shards <= 0 or num_shards & (num_shards - 1):
+            raise ValueError("num_shards must be a power of two")
+
+        self.timeout = timeout
+        self.on_expire = on_expire
+        self.max_sessions = max_sessions
+        self._mask = num_shards - 1
+        self._shards: list[dict[str, SessionState]] = [{} for _ in range(num_shards)]
+        self._locks = [threading.Lock() for _ in range(num_shards)]
+        self._heap: list[tuple[float, str]] = []
+        self._heap_lock = threading.Lock()
+
+    # ── Internal helpers ────────────────────────────────────────────────────
+
+    def _index(self, session_id: str) -> int:
+        return hash(session_id) & self._mask
+
+    def _schedule(self, deadline: float, session_id: str) -> None:
+        with self._heap_lock:
+            heapq.heappush(self._heap, (deadline, session_id))
+
+    def _removed(self, session_id: str) -> None:
+        # Called outside the shard lock, once per session that left the store.
+        if self.on_expire is not None:
+            self.on_expire(session_id)
+
+    # ── Mapping interface ──────────────────────────────────────────────────
+
+    def __setitem__(self, session_id: str, data: SessionState) -> None:
+        i = self._index(session_id)
+        with self._locks[i]:
+            is_new = session_id not in self._shards[i]
+            self._shards[i][session_id] = data
+        if is_new:
+            self._schedule(data.last_accessed + self.timeout, session_id)
+            if self.max_sessions is not None and len(self) > self.max_sessions:
+                self.evict_least_recent()
+
+    def __getitem__(self, session_id: str) -> SessionState:
+        i = self._index(session_id)
+        with self._locks[i]:
+            return self._shards[i][session_id]
+
+    def __delitem__(self, session_id: str) -> None:
+        i = self._index(session_id)
+        with self._locks[i]:
+            del self._shards[i][session_id]
+        self._removed(session_id)
+
+    def __contains__(self, session_id: object) -> bool:
+        i = self._index(session_id)
+        with self._locks[i]:
+            return session_id in self._shards[i]
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+    def __iter__(self) -> Iterator[str]:
+        # Iterate over a snapshot so concurrent writers never invalidate it.
+        for i, shard in enumerate(self._shards):
+            with self._locks[i]:
+                keys = list(shard)
+            yield from keys
+
+    def get(
+        self, session_id: str, default: Optional[SessionState] = None
+    ) -> Optional[SessionState]:
+        i = self._index(session_id)
+        with self._locks[i]:
+            return self._shards[i].get(session_id, default)
+
+    def pop(
+        self, session_id: str, default: Optional[SessionState] = None
+    ) -> Optional[SessionState]:
+        i = self._index(session_id)
+        with self._locks[i]:
+            if session_id not in self._shards[i]:
+                return default
+            data = self._shards[i].pop(session_id)
+        self._removed(session_id)
+        return data
+
+    def clear(self) -> None:
+        removed = []
+        for i, shard in enumerate(self._shards):
+            with self._locks[i]:
+                removed.extend(shard)
+                shard.clear()
+        with self._heap_lock:
+            self._heap.clear()
+        for session_id in removed:
+            self._removed(session_id)
+
+    # ── Session lifecycle ──────────────────────────────────────────────────
+
+    def touch(self, session_id: str) -> Optional[SessionState]:
+        """
+        Return the session and refresh its ``last_accessed`` timestamp.
+
+        Returns ``None`` if the session does not exist or has already
+        expired (an expired session is dropped immediately rather than
+        waiting for the next cleanup pass).
+        """
+        now = time.time()
+        i = self._index(session_id)
+        with self._locks[i]:
+            data = self._shards[i].get(session_id)
+            if data is None:
+                return None
+            if now - data.last_accessed <= self.timeout:
+                data.last_accessed = now
+                return data
+            del self._shards[i][session_id]
+
+        self._removed(session_id)
+        return None
+
+    def cleanup_expired(self, now: Optional[float] = None) -> int:
+        """
+        Drop every session idle for longer than ``timeout``.
+
+        Only heap entries whose deadline has passed are inspected.
+
+        Returns
+        -------
+        int
+            Number of sessions removed.
+        """
+        if now is None:
+            now = time.time()
+
+        removed = 0
+        while True:
+            with self._heap_lock:
+                if not self._heap or self._heap[0][0] > now:
+                    break
+                _, session_id = heapq.heappop(self._heap)
+
+            i = self._index(session_id)
+            with self._locks[i]:
+                data = self._shards[i].get(session_id)
+                if data is None:
+                    continue
+                deadline = data.last_accessed + self.timeout
+                expired = deadline <= now
+                if expired:
+                    del self._shards[i][session_id]
+
+            if expired:
+                removed += 1
+                self._removed(session_id)
+                continue
+
+            # Used since it was scheduled — re-schedule at the new deadline.
+            self._schedule(deadline, session_id)
+
+        return removed
+
+    def evict_least_recent(self) -> Optional[str]:
+        """
+        Drop the least recently used session.
+
+        Returns
+        -------
+        str or None
+            The evicted session id, or ``None`` if the store is empty.
+        """
+        while True:
+            with self._heap_lock:
+                if not self._heap:
+                    return None
+                scheduled, session_id = heapq.heappop(self._heap)
+
+            i = self._index(session_id)
+            with self._locks[i]:
+                data = self._shards[i].get(session_id)
+                if data is None:
+                    continue
+                deadline = data.last_accessed + self.timeout
+                # Accurate entry: every other session's deadline is later.
+                evict = deadline <= scheduled
+                if evict:
+                    del self._shards[i][session_id]
+
+            if evict:
+                self._removed(session_id)
+                return session_id
+
+            self._schedule(deadline, session_id)